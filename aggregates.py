@@ -0,0 +1,151 @@
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+
+from config import (
+    COUNTRY_COLUMN, COUNTRY_MAPPING, DATASET_GLOB, ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN, dataset_country_code,
+)
+
+# Statistics kept per (startdate, item) across all countries
+CUBE_STATISTICS = ["count", "sum", "mean", "min", "max", "median"]
+
+
+def as_dates(dates):
+    return dates.dt.date if is_datetime64_any_dtype(dates) else dates
+
+def build_global_cube(data):
+    # data is the long (country, item, startdate, value) table; NaN values are ignored like before
+    dates = as_dates(data[TIME_COLUMN])
+    cube = data.groupby([dates, data[ITEM_COLUMN]], observed=True, sort=True)[VALUE_COLUMN].agg(CUBE_STATISTICS)
+    return cube[cube["count"] > 0]
+
+def changed_rows(old, new):
+    # Rows of the long table that are in one version and not the other (as many times as they differ)
+    columns = [COUNTRY_COLUMN, ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN]
+    old = old[columns].astype({COUNTRY_COLUMN: str, ITEM_COLUMN: str}).value_counts(dropna=False)
+    new = new[columns].astype({COUNTRY_COLUMN: str, ITEM_COLUMN: str}).value_counts(dropna=False)
+    counts = old.sub(new, fill_value=0)
+    return counts[counts != 0].index.to_frame(index=False)
+
+def patch_global_cube(cube, data, changed):
+    # The cube after some countries changed: data is the new long table, changed the rows that differ
+    # (changed_rows). Only the (startdate, item) groups those rows fall in are recomputed.
+    groups = pd.MultiIndex.from_arrays([as_dates(changed[TIME_COLUMN]), changed[ITEM_COLUMN].astype(str)]).unique()
+    rows = pd.MultiIndex.from_arrays([as_dates(data[TIME_COLUMN]), data[ITEM_COLUMN].astype(str)]).isin(groups)
+    kept = cube[~cube.index.isin(groups)]
+    return pd.concat([kept, build_global_cube(data[rows])]).sort_index()
+
+def global_statistics(cube, date):
+    # All items for one date, one row per item
+    try:
+        return cube.xs(date, level=TIME_COLUMN)
+    except KeyError:
+        return cube.iloc[:0].droplevel(TIME_COLUMN)
+
+def global_averages(cube, date):
+    return global_statistics(cube, date)["mean"].to_dict()
+
+def _formatted(values, pattern):
+    return [pattern.format(value) if pd.notna(value) else "N/A" for value in values]
+
+def overview_table(data, date, averages, rank_index=None):
+    # Country Overview rows for one country and date against the global averages of that date,
+    # plus where the country stands among all countries when a RankIndex is given
+    rows = data[data[TIME_COLUMN] == date]
+    average = rows[ITEM_COLUMN].map(averages)
+    relative = (rows[VALUE_COLUMN] - average) / average * 100
+    items = rows[ITEM_COLUMN].to_numpy()
+    columns = {
+        "Item": items,
+        "Value": _formatted(rows[VALUE_COLUMN], "{:,.2f}"),
+        "Relative to Average": [
+            f"{change:.2f}%" if global_average else "N/A"
+            for change, global_average in zip(relative, average.fillna(0))
+        ],
+    }
+    if rank_index is not None:
+        ranks = rank_index.lookup(date, items, rows[VALUE_COLUMN].to_numpy())
+        columns["Rank"] = [
+            f"{rank:.0f} of {countries:.0f}" if pd.notna(rank) else "N/A"
+            for rank, countries in zip(ranks["rank"], ranks["countries"])
+        ]
+        columns["Percentile"] = _formatted(ranks["percentile"], "{:.0f}")
+        columns["Z-score"] = _formatted(ranks["z_score"], "{:+.2f}")
+        columns["Position in Range"] = _formatted(ranks["range_position"], "{:.0f}%")
+    return pd.DataFrame(columns)
+
+def build_cross_sections(data, countries=None):
+    # (item, startdate) x country matrix: each row is a whole map for one item and date. The columns are
+    # `countries`, by default the mapped dataset countries in dashboard order.
+    data = pd.DataFrame({
+        COUNTRY_COLUMN: data[COUNTRY_COLUMN].astype(str),
+        ITEM_COLUMN: data[ITEM_COLUMN].astype(str),
+        TIME_COLUMN: as_dates(data[TIME_COLUMN]),
+        VALUE_COLUMN: data[VALUE_COLUMN],
+    }).drop_duplicates([COUNTRY_COLUMN, ITEM_COLUMN, TIME_COLUMN])
+    cross_sections = data.pivot(index=[ITEM_COLUMN, TIME_COLUMN], columns=COUNTRY_COLUMN, values=VALUE_COLUMN)
+    if countries is None:
+        countries = [country for country in map(dataset_country_code, DATASET_GLOB) if country in COUNTRY_MAPPING]
+    return cross_sections[[country for country in countries if country in cross_sections.columns]].sort_index()
+
+def patch_cross_sections(cross_sections, data, countries):
+    # The cross-sections with the columns of `countries` rebuilt from the new long table
+    changed = build_cross_sections(data[data[COUNTRY_COLUMN].isin(countries)])
+    cross_sections = cross_sections.drop(columns=countries, errors="ignore").join(changed, how="outer")
+    order = [country for country in map(dataset_country_code, DATASET_GLOB) if country in cross_sections.columns]
+    # Same rows as a full build: every (item, startdate) that some shown country has a row for
+    shown = data[data[COUNTRY_COLUMN].isin(order)]
+    rows = pd.MultiIndex.from_arrays(
+        [shown[ITEM_COLUMN].astype(str), as_dates(shown[TIME_COLUMN])], names=[ITEM_COLUMN, TIME_COLUMN]
+    ).unique()
+    return cross_sections.reindex(index=rows, columns=order).sort_index()
+
+def _map_rows(values):
+    # values: country code -> value, without NaN
+    info = [COUNTRY_MAPPING[country] for country in values.index]
+    return pd.DataFrame({
+        "iso_alpha": [country_info["iso_alpha"] for country_info in info],
+        "country": [country_info["name"] for country_info in info],
+        "flag": [country_info["flag"] for country_info in info],
+        "value": values.to_numpy(),
+    })
+
+def cross_section_frame(cross_sections, item, date):
+    # One lookup for the whole map of an item on a date
+    try:
+        values = cross_sections.loc[(item, date)]
+    except KeyError:
+        return _map_rows(pd.Series(dtype=float))
+    return _map_rows(values.dropna())
+
+def cross_section_history(cross_sections, item):
+    # Map rows for every date of an item, with a startdate column
+    try:
+        values = cross_sections.loc[item].stack()
+    except KeyError:
+        values = pd.Series(dtype=float, index=pd.MultiIndex.from_tuples([], names=[TIME_COLUMN, COUNTRY_COLUMN]))
+    values = values.dropna()
+    rows = _map_rows(values.droplevel(TIME_COLUMN))
+    rows.insert(0, TIME_COLUMN, values.index.get_level_values(TIME_COLUMN))
+    return rows
+
+def comparison_matrix(cross_sections, item, countries):
+    # startdate x country values of one item for the selected countries, in selection order:
+    # one lookup in the cross-sections however many countries are compared
+    try:
+        values = cross_sections.loc[item]
+    except KeyError:
+        values = cross_sections.iloc[:0].droplevel(ITEM_COLUMN)
+    return values.reindex(columns=countries)
+
+def comparison_ranking(matrix, date):
+    # Selected countries ranked by their value on one date; countries without a value rank last
+    values = matrix.loc[date] if date in matrix.index else pd.Series(float("nan"), index=matrix.columns)
+    mean = values.mean()
+    table = pd.DataFrame({
+        "Rank": values.rank(ascending=False, method="min").astype("Int64"),
+        "Value": values,
+        "Relative to Selection Average (%)": (values - mean) / mean * 100 if mean else float("nan"),
+    })
+    table.index.name = COUNTRY_COLUMN
+    return table.sort_values(["Rank", COUNTRY_COLUMN], na_position="last")
+
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from config import COUNTRY_COLUMN, ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN
+
+MIN_CORRELATION_OBSERVATIONS = 3  # fewer (country, year) pairs with both items give NaN
+
+
+class IndicatorArray:
+    # Every value as a dense country x item x year array, NaN where a country has no value for that year.
+    # years is a continuous range, so neighbours on the last axis are consecutive years.
+    def __init__(self, countries, items, years, values):
+        self.countries = np.asarray(countries)
+        self.items = np.asarray(items)
+        self.years = np.asarray(years)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.item_index = {item: i for i, item in enumerate(self.items.tolist())}
+
+    @property
+    def nbytes(self):
+        return self.countries.nbytes + self.items.nbytes + self.years.nbytes + self.values.nbytes
+
+    def subset(self, items):
+        # Only the given items (those present), in the given order; the values are a copy
+        items = [item for item in items if item in self.item_index]
+        return IndicatorArray(
+            self.countries, items, self.years, self.values[:, [self.item_index[item] for item in items], :]
+        )
+
+    def frame(self, values):
+        # country x item table of a per-(country, item) result
+        return pd.DataFrame(values, index=pd.Index(self.countries, name=COUNTRY_COLUMN),
+                            columns=pd.Index(self.items, name=ITEM_COLUMN))
+
+
+def build_indicator_array(data):
+    # data is the long (country, item, startdate, value) table; several values of one year are averaged
+    data = data[data[VALUE_COLUMN].notna()]
+    countries = pd.Categorical(data[COUNTRY_COLUMN]).remove_unused_categories()
+    items = pd.Categorical(data[ITEM_COLUMN]).remove_unused_categories()
+    years = np.asarray(data[TIME_COLUMN], dtype="datetime64[Y]").astype(np.int64) + 1970
+    first = years.min() if len(years) else 0
+    span = years.max() - first + 1 if len(years) else 0
+    shape = (len(countries.categories), len(items.categories), span)
+    cells = np.ravel_multi_index((countries.codes, items.codes, years - first), shape)
+    size = int(np.prod(shape))
+    counts = np.bincount(cells, minlength=size)
+    sums = np.bincount(cells, data[VALUE_COLUMN].to_numpy(dtype=np.float64), minlength=size)
+    with np.errstate(invalid="ignore"):
+        values = np.where(counts > 0, sums / counts, np.nan)
+    return IndicatorArray(
+        countries.categories.to_numpy(dtype=str), items.categories.to_numpy(dtype=str),
+        np.arange(first, first + span), values.reshape(shape),
+    )
+
+
+def trend_slopes(array):
+    # Least-squares change per year of every (country, item) series, over the years that have a value;
+    # NaN with fewer than two years
+    values = array.values
+    present = ~np.isnan(values)
+    x = np.where(present, array.years - array.years.mean(), 0.0)
+    y = np.where(present, values, 0.0)
+    n = present.sum(axis=-1)
+    sx, sy = x.sum(axis=-1), y.sum(axis=-1)
+    sxx, sxy = (x * x).sum(axis=-1), (x * y).sum(axis=-1)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where((n >= 2) & (denominator > 0), (n * sxy - sx * sy) / denominator, np.nan)
+    return array.frame(slopes)
+
+
+def yoy_volatility(array):
+    # Standard deviation of the year-over-year change (%) of every (country, item) series; only
+    # consecutive years both with a value count, NaN with fewer than two such changes
+    previous, current = array.values[..., :-1], array.values[..., 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = (current - previous) / np.abs(previous) * 100
+    present = np.isfinite(changes)
+    changes = np.where(present, changes, 0.0)
+    n = present.sum(axis=-1)
+    mean = changes.sum(axis=-1) / np.maximum(n, 1)
+    squares = (np.where(present, changes - mean[..., None], 0.0) ** 2).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volatility = np.where(n >= 2, np.sqrt(squares / (n - 1)), np.nan)
+    return array.frame(volatility)
+
+
+def _column_means(observations, present):
+    counts = present.sum(axis=0)
+    return np.where(present, observations, 0.0).sum(axis=0) / np.maximum(counts, 1)
+
+
+def correlation_matrix(array, within_countries=False):
+    # item x item Pearson correlation over the (country, year) pairs where both items have a value,
+    # like DataFrame.corr() but as a few matrix products. within_countries removes each country's own
+    # mean first, so only movements over time count and not level differences between countries.
+    values = array.values
+    if within_countries:
+        present = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            means = np.where(present, values, 0.0).sum(axis=-1) / present.sum(axis=-1)
+        values = values - means[..., None]
+    observations = values.transpose(0, 2, 1).reshape(-1, len(array.items))  # (country, year) x item
+    present = ~np.isnan(observations)
+    mask = present.astype(np.float64)
+    # Centred on the overall item means, which leaves the correlations unchanged but keeps the sums small
+    centred = np.where(present, observations - _column_means(observations, present), 0.0)
+    n = mask.T @ mask
+    sx = centred.T @ mask  # sx[a, b]: sum of item a where b also has a value
+    sxx = (centred * centred).T @ mask
+    sxy = centred.T @ centred
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = sxy - sx * sx.T / n
+        correlations = covariance / np.sqrt((sxx - sx * sx / n) * (sxx.T - sx.T * sx.T / n))
+    correlations = np.where(n >= MIN_CORRELATION_OBSERVATIONS, np.clip(correlations, -1, 1), np.nan)
+    index = pd.Index(array.items, name=ITEM_COLUMN)
+    return pd.DataFrame(correlations, index=index, columns=index.rename(None))
+
+
+def strongest_pairs(correlations, count=10):
+    # The `count` item pairs with the largest absolute correlation, each pair once
+    upper = np.triu(np.ones(correlations.shape, dtype=bool), k=1)
+    rows, columns = np.nonzero(upper & correlations.notna().to_numpy())
+    values = correlations.to_numpy()[rows, columns]
+    order = np.argsort(-np.abs(values), kind="stable")[:count]
+    return pd.DataFrame({
+        "Item": correlations.index[rows[order]],
+        "Other item": correlations.columns[columns[order]],
+        "Correlation": values[order],
+    })
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aggregates import (
+    build_cross_sections, build_global_cube, cross_section_history, global_averages, overview_table,
+)
+from changes import pairwise_changes, value_matrix
+from config import (
+    ARTIFACT_DIR, GITHUB_RAW_BASE_URL, HTTP_CACHE_DIR, INCLUDED_ITEMS, LOCAL_DATASET_DIR, MANIFEST_PATH,
+    PANEL_PATH, TIME_COLUMN, in_year_range,
+)
+from figures import animated_map_figure, time_series_figure
+from ingest import ingest
+from panel import Panel, load_manifest, load_panel
+from ranking import build_rank_index
+from sources import SOURCE_KINDS, SOURCE_LOCAL, SOURCE_REMOTE, make_dataset_source
+
+REPORT_DIR = os.path.join(ARTIFACT_DIR, "reports")
+
+# Per-process state of the pool workers, loaded once by _init_worker
+_panel = None
+_cube = None
+_ranks = None
+_averages = {}
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def _json_matrix(values):
+    # NaN and +-inf (a change from 0) become null
+    return np.where(np.isfinite(values), values, None).tolist()
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, default=str)
+
+def _write_table(frame, path):
+    # Parquet when pyarrow/fastparquet is installed, CSV otherwise; returns the file written
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        frame.to_parquet(f"{path}.parquet")
+        return f"{path}.parquet"
+    except ImportError:
+        frame.to_csv(f"{path}.csv")
+        return f"{path}.csv"
+
+def _init_worker(panel_path):
+    global _panel, _cube, _ranks
+    _panel = Panel.load(panel_path)
+    data = _panel.to_frame(INCLUDED_ITEMS)
+    _cube = build_global_cube(data)
+    _ranks = build_rank_index(data)
+
+def _global_averages(date):
+    # Every country of a worker asks for the same few dates
+    if date not in _averages:
+        _averages[date] = global_averages(_cube, date)
+    return _averages[date]
+
+def country_report(country, output_dir, html=True):
+    # Every Country Overview table and Time Series change matrix of one country
+    data = _panel.country_frame(country)
+    dates = [date for date in sorted(data[TIME_COLUMN].unique()) if in_year_range(date)]
+    country_dir = os.path.join(output_dir, "countries", country)
+
+    overview = {
+        str(date): overview_table(data, date, _global_averages(date), _ranks).to_dict(orient="records")
+        for date in dates
+    }
+    _write_json(os.path.join(country_dir, "overview.json"), overview)
+
+    matrix = value_matrix(data)
+    changes = {
+        item: _json_matrix(pairwise_changes(matrix, item).loc[dates, dates].to_numpy())
+        for item in matrix.columns
+    }
+    _write_json(os.path.join(country_dir, "changes.json"), {"dates": dates, "percentage_change": changes})
+
+    if html:
+        time_series_figure(data).write_html(os.path.join(country_dir, "time_series.html"), include_plotlyjs="cdn")
+    return country, len(data)
+
+def global_report(panel, output_dir, html=True):
+    # Global Analysis cross-sections, the global statistics cube and one animated map per item
+    data = panel.to_frame(INCLUDED_ITEMS)
+    global_dir = os.path.join(output_dir, "global")
+    cross_sections = build_cross_sections(data)
+    files = [
+        _write_table(cross_sections.reset_index(), os.path.join(global_dir, "cross_sections")),
+        _write_table(build_global_cube(data).reset_index(), os.path.join(global_dir, "global_statistics")),
+    ]
+    if html:
+        for item in cross_sections.index.get_level_values(0).unique():
+            history = cross_section_history(cross_sections, item)
+            history = history[[in_year_range(date) for date in history[TIME_COLUMN]]]
+            path = os.path.join(global_dir, "maps", f"{_slug(item)}.html")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            animated_map_figure(history, item).write_html(path, include_plotlyjs="cdn")
+            files.append(path)
+    return files
+
+def run_batch(panel, output_dir=REPORT_DIR, workers=None, html=True, panel_path=PANEL_PATH):
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panel_path,)) as pool:
+        futures = [pool.submit(country_report, country, output_dir, html) for country in panel.countries.tolist()]
+        global_files = global_report(panel, output_dir, html)
+        countries = dict(future.result() for future in futures)
+    summary = {
+        "countries": countries,
+        "global": [os.path.relpath(path, output_dir) for path in global_files],
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    _write_json(os.path.join(output_dir, "index.json"), summary)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute every dashboard view as static report files.")
+    parser.add_argument("--source", choices=SOURCE_KINDS, default=SOURCE_LOCAL)
+    parser.add_argument("--output", default=REPORT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--no-html", action="store_true", help="skip the Plotly HTML figures")
+    args = parser.parse_args()
+
+    source = make_dataset_source(args.source, LOCAL_DATASET_DIR, GITHUB_RAW_BASE_URL, cache_dir=HTTP_CACHE_DIR)
+    if args.source == SOURCE_REMOTE:
+        panel = load_panel(PANEL_PATH, source, LOCAL_DATASET_DIR)
+    else:
+        # By content, like the app: file mtimes miss a CSV restored with its original mtime
+        panel = ingest(source)[0]
+    load_manifest(MANIFEST_PATH, panel)
+    summary = run_batch(panel, args.output, args.workers, html=not args.no_html)
+    print(f"{len(summary['countries'])} countries, {len(summary['global'])} global files "
+          f"in {summary['seconds']} s -> {args.output}")
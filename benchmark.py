@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from aggregates import (
+    build_cross_sections, build_global_cube, comparison_matrix, cross_section_frame, cross_section_history,
+    global_averages, overview_table,
+)
+from analytics import build_indicator_array, correlation_matrix, trend_slopes, yoy_volatility
+from changes import pairwise_changes, value_matrix
+from config import (
+    ARTIFACT_DIR, COUNTRY_MAPPING, DATASET_GLOB, INCLUDED_ITEMS, ITEM_COLUMN, LOCAL_DATASET_DIR, TIME_COLUMN,
+    dataset_country_code,
+)
+from figures import (
+    COMPARISON_OVERLAID, COMPARISON_SMALL_MULTIPLES, animated_map_figure, comparison_figure,
+    correlation_figure, global_map_figure, item_time_series_figure, time_series_figure,
+)
+from panel import build_manifest, build_panel, manifest_options
+from preprocessing import READ_CSV_OPTIONS, preprocess_data
+from sources import LocalDatasetSource
+
+BENCHMARK_DIR = os.path.join(ARTIFACT_DIR, "benchmarks")
+FILE_PREFIX = "suite-of-food-security-indicators_"
+
+# Same header (and HXL tag row) as the HDX country files
+CSV_HEADER = [
+    "Iso3", "StartDate", "EndDate", "Area Code", "Area Code (M49)", "Area", "Item Code", "Item",
+    "Element Code", "Element", "Year Code", "Year", "Unit", "Value", "Flag", "Note",
+]
+CSV_TAGS = [
+    "#country+code", "#date+start", "#date+end", "", "", "#country+name", "#indicator+code",
+    "#indicator+name", "", "", "", "#date+year", "#indicator+type", "#indicator+value+num", "", "",
+]
+
+# countries, items, years; "small" is about the size of path-to-datasets/
+SCALES = {
+    "small": (78, 56, 24),
+    "medium": (200, 150, 30),
+    "large": (400, 300, 50),
+}
+
+
+def synthetic_countries(count):
+    # The real country codes first so maps stay populated, then made-up ones
+    real = [dataset_country_code(file_name) for file_name in DATASET_GLOB]
+    return real[:count] + [f"s{i:03d}" for i in range(count - len(real))]
+
+def synthetic_mapping(countries):
+    # COUNTRY_MAPPING entries for the made-up codes, so the map and comparison stages include them
+    return {
+        country: {"name": f"Synthetic {country}", "iso_alpha": country.upper(), "iso_alpha_2": "", "flag": ""}
+        for country in countries if country not in COUNTRY_MAPPING
+    }
+
+def synthetic_items(count):
+    synthetic = [f"Synthetic indicator {i:03d} (index)" for i in range(count - len(INCLUDED_ITEMS))]
+    return INCLUDED_ITEMS[:count] + synthetic
+
+def _synthetic_csv(country, items, years, rng):
+    # One row per (item, year), about 10% of them missing; some values censored ("<2.5") or blank
+    item_index, year_index = np.meshgrid(np.arange(len(items)), np.arange(len(years)), indexing="ij")
+    keep = rng.random(item_index.size) >= 0.1
+    item_index, year_index = item_index.ravel()[keep], year_index.ravel()[keep]
+    start = np.asarray(years)[year_index]
+    levels = rng.uniform(1, 1000, len(items))[item_index]
+    values = np.round(levels * (1 + 0.02 * (start - years[0])) * rng.normal(1, 0.05, len(start)), 1).astype(str)
+    noise = rng.random(len(values))
+    values = np.where(noise < 0.03, "<2.5", np.where(noise < 0.05, "", values))
+    rows = len(values)
+    return pd.DataFrame({
+        "Iso3": country.upper(),
+        "StartDate": [f"{year}-01-01" for year in start],
+        "EndDate": [f"{year + 2}-12-31" for year in start],
+        "Area Code": 0,
+        "Area Code (M49)": "'000",
+        "Area": country.upper(),
+        "Item Code": 20000 + item_index,
+        "Item": np.asarray(items, dtype=object)[item_index],
+        "Element Code": 6121,
+        "Element": "Value",
+        "Year Code": [f"{year}{year + 2}" for year in start],
+        "Year": start + 2,
+        "Unit": "%",
+        "Value": values,
+        "Flag": np.full(rows, "E"),
+        "Note": np.full(rows, ""),
+    }, columns=CSV_HEADER)
+
+def write_synthetic_datasets(directory, countries, items, years, seed=0):
+    # Country CSVs in the HDX layout; reused when the directory is already complete
+    file_names = [f"{FILE_PREFIX}{country}.csv" for country in synthetic_countries(countries)]
+    if all(os.path.exists(os.path.join(directory, file_name)) for file_name in file_names):
+        return file_names
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    item_names = synthetic_items(items)
+    year_range = list(range(2020 - years, 2020))
+    for file_name in file_names:
+        frame = _synthetic_csv(dataset_country_code(file_name), item_names, year_range, rng)
+        with open(os.path.join(directory, file_name), "w", newline="") as f:
+            f.write(",".join(CSV_HEADER) + "\n" + ",".join(CSV_TAGS) + "\n")
+            frame.to_csv(f, index=False, header=False)
+    return file_names
+
+def measure(function, repeat):
+    # Best and median wall time over `repeat` runs, then one run under tracemalloc for the peak;
+    # returns (stats, result). tracemalloc sees Python and numpy allocations, not Arrow buffers.
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"best": min(timings), "median": statistics.median(timings), "peak_mib": peak / 2 ** 20}, result
+
+def run_benchmark(directory, files, items=INCLUDED_ITEMS, repeat=3):
+    # Every stage of the dashboard, in the order a cold start runs them; items=None keeps every item
+    results = {}
+
+    def stage(name, function):
+        results[name], result = measure(function, repeat)
+        print(f"  {name:<28} best {results[name]['best'] * 1000:>9.1f} ms   "
+              f"median {results[name]['median'] * 1000:>9.1f} ms   peak {results[name]['peak_mib']:>8.1f} MiB")
+        return result
+
+    source = LocalDatasetSource(directory)
+    raw = stage("read_csv", lambda: [source.read_csv(file_name, **READ_CSV_OPTIONS) for file_name in files])
+    stage("preprocess_data", lambda: [preprocess_data(frame, items) for frame in raw])
+    panel = stage("build_panel", lambda: build_panel(source, files))
+    data = stage("panel.to_frame", lambda: panel.to_frame(items))
+
+    # Country Overview
+    cube = stage("build_global_cube", lambda: build_global_cube(data))
+    dates = cube.index.get_level_values(TIME_COLUMN).unique()
+    date = dates[len(dates) // 2]
+    averages = stage("calculate_global_averages", lambda: global_averages(cube, date))
+    country = panel.countries[0]
+    country_data = stage("panel.country_frame", lambda: panel.country_frame(country, items))
+    stage("overview_table", lambda: overview_table(country_data, date, averages))
+
+    # Time Series and Comparison
+    stage("time_series_figure", lambda: time_series_figure(country_data))
+    matrix = stage("value_matrix", lambda: value_matrix(country_data))
+    stage("pairwise_changes", lambda: [pairwise_changes(matrix, item) for item in matrix.columns])
+    item = country_data[ITEM_COLUMN].iloc[0]
+    item_data = country_data[country_data[ITEM_COLUMN] == item]
+    stage("item_time_series_figure", lambda: item_time_series_figure(item_data, item))
+
+    # Global Analysis
+    manifest = stage("build_manifest", lambda: build_manifest(panel))
+    stage("manifest_options", lambda: manifest_options(manifest, items if items is not None else panel.items))
+    # Every country of the panel, not only the mapped dataset countries the dashboard shows
+    COUNTRY_MAPPING.update(synthetic_mapping(panel.countries.tolist()))
+    cross_sections = stage("build_cross_sections", lambda: build_cross_sections(data, panel.countries.tolist()))
+    map_data = stage("cross_section_frame", lambda: cross_section_frame(cross_sections, item, date))
+    stage("global_map_figure", lambda: global_map_figure(map_data, item, date))
+    history = stage("cross_section_history", lambda: cross_section_history(cross_sections, item))
+    stage("animated_map_figure", lambda: animated_map_figure(history, item))
+
+    # Comparison Analysis, with more countries than the default two
+    compared = list(cross_sections.columns[:8])
+    comparison = stage("comparison_matrix", lambda: comparison_matrix(cross_sections, item, compared))
+    stage("comparison_figure", lambda: comparison_figure(comparison, item, COMPARISON_OVERLAID))
+    stage("comparison_small_multiples", lambda: comparison_figure(comparison, item, COMPARISON_SMALL_MULTIPLES))
+
+    # Indicator Analytics
+    array = stage("build_indicator_array", lambda: build_indicator_array(data))
+    stage("trend_slopes", lambda: trend_slopes(array))
+    stage("yoy_volatility", lambda: yoy_volatility(array))
+    correlations = stage("correlation_matrix", lambda: correlation_matrix(array))
+    stage("correlation_figure", lambda: correlation_figure(correlations, "Correlation between indicators"))
+
+    return {"rows": len(panel), "countries": len(panel.countries), "items": len(panel.items), "stages": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and measure peak memory of every dashboard stage.")
+    parser.add_argument(
+        "--scale", action="append",
+        help=f"'real' (path-to-datasets/), a synthetic preset {sorted(SCALES)} "
+             f"or COUNTRIES,ITEMS,YEARS; repeatable (default: real)",
+    )
+    parser.add_argument("--all-items", action="store_true", help="keep every item instead of INCLUDED_ITEMS")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    items = None if args.all_items else INCLUDED_ITEMS
+    report = {}
+    for scale in args.scale or ["real"]:
+        if scale == "real":
+            directory, files = LOCAL_DATASET_DIR, DATASET_GLOB
+        else:
+            countries, item_count, years = SCALES[scale] if scale in SCALES else map(int, scale.split(","))
+            directory = os.path.join(BENCHMARK_DIR, f"synthetic-{countries}x{item_count}x{years}")
+            print(f"{scale}: generating {directory}")
+            files = write_synthetic_datasets(directory, countries, item_count, years)
+        print(f"{scale}: {len(files)} files")
+        report[scale] = run_benchmark(directory, files, items, args.repeat)
+        print(f"{scale}: {report[scale]['rows']} rows, {report[scale]['countries']} countries, "
+              f"{report[scale]['items']} items")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"items": "all" if args.all_items else "included", "repeat": args.repeat, "scales": report},
+                      f, indent=2)
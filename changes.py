@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from config import ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN
+
+DAYS_PER_YEAR = 365.25
+
+
+def value_matrix(data):
+    # date x item matrix of one country's values; a missing (date, item) is NaN
+    data = data.drop_duplicates([TIME_COLUMN, ITEM_COLUMN])
+    return data.pivot(index=TIME_COLUMN, columns=ITEM_COLUMN, values=VALUE_COLUMN).sort_index()
+
+def change_table(matrix, starting_date, ending_date):
+    # Change of every item between two dates, one row per item
+    starting_values, ending_values = matrix.reindex([starting_date, ending_date]).to_numpy()
+    years = (pd.Timestamp(ending_date) - pd.Timestamp(starting_date)).days / DAYS_PER_YEAR
+    with np.errstate(divide="ignore", invalid="ignore"):
+        absolute_change = ending_values - starting_values
+        cagr = ((ending_values / starting_values) ** (1 / years) - 1) * 100 if years > 0 else np.nan
+        return pd.DataFrame({
+            "start": starting_values,
+            "end": ending_values,
+            "absolute_change": absolute_change,
+            "percentage_change": absolute_change / starting_values * 100,
+            "cagr": cagr,
+        }, index=matrix.columns)
+
+def pairwise_changes(matrix, item):
+    # Percentage change from every date (rows) to every other date (columns) for one item
+    values = matrix[item].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = (values[None, :] - values[:, None]) / values[:, None] * 100
+    return pd.DataFrame(changes, index=matrix.index, columns=matrix.index)
@@ -1,279 +1,457 @@
+import cProfile
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import time
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import requests
-from io import StringIO
-from datetime import datetime
-
-# Included Items
-INCLUDED_ITEMS = [
-    "Average dietary energy supply adequacy (percent) (3-year average)",
-    "Average protein supply (g/cap/day) (3-year average)",
-    "Coefficient of variation of habitual caloric consumption distribution (real number)",
-    "Number of children under 5 years of age who are stunted (modeled estimates)",
-    "Percentage of children under 5 years of age who are stunted (modelled estimates) (percent)",
-    "Per capita food supply variability (kcal/cap/day)",
-    "Percentage of population using at least basic sanitation services (percent)",
-    "Percentage of population using safely managed drinking water services (percent)",
-    "Prevalence of low birthweight (percent)",
-    "Political stability and absence of violence/terrorism (index)",
-    "Prevalence of obesity in the adult population (18 years and older) (percent)",
-    "Prevalence of undernourishment (percent) (3-year average)",
-    "Share of dietary energy supply derived from cereals, roots and tubers (percent) (3-year average)"
-]
-
-# Constants
-FLAG_IMAGE_BASE_URL = "https://raw.githubusercontent.com/Manny735/Project-1/refs/heads/main/flags/"
-GITHUB_RAW_BASE_URL = "https://raw.githubusercontent.com/Manny735/Project-1/refs/heads/main/path-to-datasets/"
-
-DATASET_GLOB = [
-    "suite-of-food-security-indicators_rus.csv",  # Russia
-    "suite-of-food-security-indicators_can.csv",  # Canada
-    "suite-of-food-security-indicators_chn.csv",  # China
-    "suite-of-food-security-indicators_usa.csv",  # United States
-    "suite-of-food-security-indicators_bra.csv",  # Brazil
-    "suite-of-food-security-indicators_aus.csv",  # Australia
-    "suite-of-food-security-indicators_ind.csv",  # India
-    "suite-of-food-security-indicators_arg.csv",  # Argentina
-    "suite-of-food-security-indicators_kaz.csv",  # Kazakhstan
-    "suite-of-food-security-indicators_dza.csv",  # Algeria
-    "suite-of-food-security-indicators_cod.csv",  # Congo (DR)
-    "suite-of-food-security-indicators_sau.csv",  # Saudi Arabia
-    "suite-of-food-security-indicators_mex.csv",  # Mexico
-    "suite-of-food-security-indicators_idn.csv",  # Indonesia
-    "suite-of-food-security-indicators_sdn.csv",  # Sudan
-    "suite-of-food-security-indicators_lby.csv",  # Libya
-    "suite-of-food-security-indicators_irn.csv",  # Iran
-    "suite-of-food-security-indicators_mng.csv",  # Mongolia
-    "suite-of-food-security-indicators_per.csv",  # Peru
-    "suite-of-food-security-indicators_tcd.csv",  # Chad
-    "suite-of-food-security-indicators_ner.csv",  # Niger
-    "suite-of-food-security-indicators_ago.csv",  # Angola
-    "suite-of-food-security-indicators_mli.csv",  # Mali
-    "suite-of-food-security-indicators_zaf.csv",  # South Africa
-    "suite-of-food-security-indicators_col.csv",  # Colombia
-    "suite-of-food-security-indicators_eth.csv",  # Ethiopia
-    "suite-of-food-security-indicators_bol.csv",  # Bolivia
-    "suite-of-food-security-indicators_mrt.csv",  # Mauritania
-    "suite-of-food-security-indicators_egy.csv",  # Egypt
-    "suite-of-food-security-indicators_tza.csv",  # Tanzania
-    "suite-of-food-security-indicators_nga.csv",  # Nigeria
-    "suite-of-food-security-indicators_ven.csv",  # Venezuela
-    "suite-of-food-security-indicators_pak.csv",  # Pakistan
-    "suite-of-food-security-indicators_moz.csv",  # Mozambique
-    "suite-of-food-security-indicators_tur.csv",  # Turkey
-    "suite-of-food-security-indicators_chl.csv",  # Chile
-    "suite-of-food-security-indicators_zmb.csv",  # Zambia
-    "suite-of-food-security-indicators_mmr.csv",  # Myanmar (Burma)
-    "suite-of-food-security-indicators_afg.csv",  # Afghanistan
-    "suite-of-food-security-indicators_ssd.csv",  # South Sudan
-    "suite-of-food-security-indicators_fra.csv",  # France (European part)
-    "suite-of-food-security-indicators_som.csv",  # Somalia
-    "suite-of-food-security-indicators_caf.csv",  # Central African Republic
-    "suite-of-food-security-indicators_ukr.csv",  # Ukraine
-    "suite-of-food-security-indicators_mdg.csv",  # Madagascar
-    "suite-of-food-security-indicators_bwa.csv",  # Botswana
-    "suite-of-food-security-indicators_ken.csv",  # Kenya
-    "suite-of-food-security-indicators_yem.csv",  # Yemen
-    "suite-of-food-security-indicators_tha.csv",  # Thailand
-    "suite-of-food-security-indicators_esp.csv",  # Spain
-    "suite-of-food-security-indicators_tkm.csv",  # Turkmenistan
-    "suite-of-food-security-indicators_cmr.csv",  # Cameroon
-    "suite-of-food-security-indicators_png.csv",  # Papua New Guinea
-    "suite-of-food-security-indicators_swe.csv",  # Sweden
-    "suite-of-food-security-indicators_uzb.csv",  # Uzbekistan
-    "suite-of-food-security-indicators_mar.csv",  # Morocco
-    "suite-of-food-security-indicators_irq.csv",  # Iraq
-    "suite-of-food-security-indicators_pry.csv",  # Paraguay
-    "suite-of-food-security-indicators_zwe.csv",  # Zimbabwe
-    "suite-of-food-security-indicators_jpn.csv",  # Japan
-    "suite-of-food-security-indicators_deu.csv",  # Germany
-    "suite-of-food-security-indicators_cog.csv",  # Republic of the Congo
-    "suite-of-food-security-indicators_fin.csv",  # Finland
-    "suite-of-food-security-indicators_vnm.csv",  # Vietnam
-    "suite-of-food-security-indicators_mys.csv",  # Malaysia
-    "suite-of-food-security-indicators_nor.csv",  # Norway
-    "suite-of-food-security-indicators_civ.csv",  # Ivory Coast
-    "suite-of-food-security-indicators_pol.csv",  # Poland
-    "suite-of-food-security-indicators_omn.csv",  # Oman
-    "suite-of-food-security-indicators_ita.csv",  # Italy
-    "suite-of-food-security-indicators_phl.csv",  # Philippines
-    "suite-of-food-security-indicators_ecu.csv",  # Ecuador
-    "suite-of-food-security-indicators_bfa.csv",  # Burkina Faso
-    "suite-of-food-security-indicators_nzl.csv",  # New Zealand
-    "suite-of-food-security-indicators_gab.csv",  # Gabon
-    "suite-of-food-security-indicators_gin.csv",  # Guinea
-    "suite-of-food-security-indicators_gbr.csv",  # United Kingdom
-    "suite-of-food-security-indicators_uga.csv"   # Uganda
-]
-
-COUNTRY_MAPPING = {
-    "rus": {"name": "Russia", "iso_alpha": "RUS", "iso_alpha_2": "ru", "flag": "🇷🇺"},
-    "can": {"name": "Canada", "iso_alpha": "CAN", "iso_alpha_2": "ca", "flag": "🇨🇦"},
-    "chn": {"name": "China", "iso_alpha": "CHN", "iso_alpha_2": "cn", "flag": "🇨🇳"},
-    "usa": {"name": "United States", "iso_alpha": "USA", "iso_alpha_2": "us", "flag": "🇺🇸"},
-    "bra": {"name": "Brazil", "iso_alpha": "BRA", "iso_alpha_2": "br", "flag": "🇧🇷"},
-    "aus": {"name": "Australia", "iso_alpha": "AUS", "iso_alpha_2": "au", "flag": "🇦🇺"},
-    "ind": {"name": "India", "iso_alpha": "IND", "iso_alpha_2": "in", "flag": "🇮🇳"},
-    "arg": {"name": "Argentina", "iso_alpha": "ARG", "iso_alpha_2": "ar", "flag": "🇦🇷"},
-    "kaz": {"name": "Kazakhstan", "iso_alpha": "KAZ", "iso_alpha_2": "kz", "flag": "🇰🇿"},
-    "dza": {"name": "Algeria", "iso_alpha": "DZA", "iso_alpha_2": "dz", "flag": "🇩🇿"},
-    "cod": {"name": "Congo (DR)", "iso_alpha": "COD", "iso_alpha_2": "cd", "flag": "🇨🇩"},
-    "sau": {"name": "Saudi Arabia", "iso_alpha": "SAU", "iso_alpha_2": "sa", "flag": "🇸🇦"},
-    "mex": {"name": "Mexico", "iso_alpha": "MEX", "iso_alpha_2": "mx", "flag": "🇲🇽"},
-    "idn": {"name": "Indonesia", "iso_alpha": "IDN", "iso_alpha_2": "id", "flag": "🇮🇩"},
-    "sdn": {"name": "Sudan", "iso_alpha": "SDN", "iso_alpha_2": "sd", "flag": "🇸🇩"},
-    "lby": {"name": "Libya", "iso_alpha": "LBY", "iso_alpha_2": "ly", "flag": "🇱🇾"},
-    "irn": {"name": "Iran", "iso_alpha": "IRN", "iso_alpha_2": "ir", "flag": "🇮🇷"},
-    "mng": {"name": "Mongolia", "iso_alpha": "MNG", "iso_alpha_2": "mn", "flag": "🇲🇳"},
-    "per": {"name": "Peru", "iso_alpha": "PER", "iso_alpha_2": "pe", "flag": "🇵🇪"},
-    "tcd": {"name": "Chad", "iso_alpha": "TCD", "iso_alpha_2": "td", "flag": "🇹🇩"},
-    "ner": {"name": "Niger", "iso_alpha": "NER", "iso_alpha_2": "ne", "flag": "🇳🇪"},
-    "ago": {"name": "Angola", "iso_alpha": "AGO", "iso_alpha_2": "ao", "flag": "🇦🇴"},
-    "mli": {"name": "Mali", "iso_alpha": "MLI", "iso_alpha_2": "ml", "flag": "🇲🇱"},
-    "zaf": {"name": "South Africa", "iso_alpha": "ZAF", "iso_alpha_2": "za", "flag": "🇿🇦"},
-    "col": {"name": "Colombia", "iso_alpha": "COL", "iso_alpha_2": "co", "flag": "🇨🇴"},
-    "eth": {"name": "Ethiopia", "iso_alpha": "ETH", "iso_alpha_2": "et", "flag": "🇪🇹"},
-    "bol": {"name": "Bolivia", "iso_alpha": "BOL", "iso_alpha_2": "bo", "flag": "🇧🇴"},
-    "mrt": {"name": "Mauritania", "iso_alpha": "MRT", "iso_alpha_2": "mr", "flag": "🇲🇷"},
-    "egy": {"name": "Egypt", "iso_alpha": "EGY", "iso_alpha_2": "eg", "flag": "🇪🇬"},
-    "tza": {"name": "Tanzania", "iso_alpha": "TZA", "iso_alpha_2": "tz", "flag": "🇹🇿"},
-    "nga": {"name": "Nigeria", "iso_alpha": "NGA", "iso_alpha_2": "ng", "flag": "🇳🇬"},
-    "ven": {"name": "Venezuela", "iso_alpha": "VEN", "iso_alpha_2": "ve", "flag": "🇻🇪"},
-    "nam": {"name": "Namibia", "iso_alpha": "NAM", "iso_alpha_2": "na", "flag": "🇳🇦"},
-    "pak": {"name": "Pakistan", "iso_alpha": "PAK", "iso_alpha_2": "pk", "flag": "🇵🇰"},
-    "moz": {"name": "Mozambique", "iso_alpha": "MOZ", "iso_alpha_2": "mz", "flag": "🇲🇿"},
-    "tur": {"name": "Turkey", "iso_alpha": "TUR", "iso_alpha_2": "tr", "flag": "🇹🇷"},
-    "chl": {"name": "Chile", "iso_alpha": "CHL", "iso_alpha_2": "cl", "flag": "🇨🇱"},
-    "zmb": {"name": "Zambia", "iso_alpha": "ZMB", "iso_alpha_2": "zm", "flag": "🇿🇲"},
-    "mmr": {"name": "Myanmar (Burma)", "iso_alpha": "MMR", "iso_alpha_2": "mm", "flag": "🇲🇲"},
-    "afg": {"name": "Afghanistan", "iso_alpha": "AFG", "iso_alpha_2": "af", "flag": "🇦🇫"},
-    "ssd": {"name": "South Sudan", "iso_alpha": "SSD", "iso_alpha_2": "ss", "flag": "🇸🇸"},
-    "fra": {"name": "France (European part)", "iso_alpha": "FRA", "iso_alpha_2": "fr", "flag": "🇫🇷"},
-    "som": {"name": "Somalia", "iso_alpha": "SOM", "iso_alpha_2": "so", "flag": "🇸🇴"},
-    "caf": {"name": "Central African Republic", "iso_alpha": "CAF", "iso_alpha_2": "cf", "flag": "🇨🇫"},
-    "ukr": {"name": "Ukraine", "iso_alpha": "UKR", "iso_alpha_2": "ua", "flag": "🇺🇦"},
-    "mdg": {"name": "Madagascar", "iso_alpha": "MDG", "iso_alpha_2": "mg", "flag": "🇲🇬"},
-    "bwa": {"name": "Botswana", "iso_alpha": "BWA", "iso_alpha_2": "bw", "flag": "🇧🇼"},
-    "ken": {"name": "Kenya", "iso_alpha": "KEN", "iso_alpha_2": "ke", "flag": "🇰🇪"},
-    "yem": {"name": "Yemen", "iso_alpha": "YEM", "iso_alpha_2": "ye", "flag": "🇾🇪"},
-    "tha": {"name": "Thailand", "iso_alpha": "THA", "iso_alpha_2": "th", "flag": "🇹🇭"},
-    "esp": {"name": "Spain", "iso_alpha": "ESP", "iso_alpha_2": "es", "flag": "🇪🇸"},
-    "tkm": {"name": "Turkmenistan", "iso_alpha": "TKM", "iso_alpha_2": "tm", "flag": "🇹🇲"},
-    "cmr": {"name": "Cameroon", "iso_alpha": "CMR", "iso_alpha_2": "cm", "flag": "🇨🇲"},
-    "png": {"name": "Papua New Guinea", "iso_alpha": "PNG", "iso_alpha_2": "pg", "flag": "🇵🇬"},
-    "swe": {"name": "Sweden", "iso_alpha": "SWE", "iso_alpha_2": "se", "flag": "🇸🇪"},
-    "uzb": {"name": "Uzbekistan", "iso_alpha": "UZB", "iso_alpha_2": "uz", "flag": "🇺🇿"},
-    "mar": {"name": "Morocco", "iso_alpha": "MAR", "iso_alpha_2": "ma", "flag": "🇲🇦"},
-    "irq": {"name": "Iraq", "iso_alpha": "IRQ", "iso_alpha_2": "iq", "flag": "🇮🇶"},
-    "pry": {"name": "Paraguay", "iso_alpha": "PRY", "iso_alpha_2": "py", "flag": "🇵🇾"},
-    "zwe": {"name": "Zimbabwe", "iso_alpha": "ZWE", "iso_alpha_2": "zw", "flag": "🇿🇼"},
-    "jpn": {"name": "Japan", "iso_alpha": "JPN", "iso_alpha_2": "jp", "flag": "🇯🇵"},
-    "deu": {"name": "Germany", "iso_alpha": "DEU", "iso_alpha_2": "de", "flag": "🇩🇪"},
-    "cog": {"name": "Republic of the Congo", "iso_alpha": "COG", "iso_alpha_2": "cg", "flag": "🇨🇬"},
-    "fin": {"name": "Finland", "iso_alpha": "FIN", "iso_alpha_2": "fi", "flag": "🇫🇮"},
-    "vnm": {"name": "Vietnam", "iso_alpha": "VNM", "iso_alpha_2": "vn", "flag": "🇻🇳"},
-    "mys": {"name": "Malaysia", "iso_alpha": "MYS", "iso_alpha_2": "my", "flag": "🇲🇾"},
-    "nor": {"name": "Norway", "iso_alpha": "NOR", "iso_alpha_2": "no", "flag": "🇳🇴"},
-    "civ": {"name": "Ivory Coast", "iso_alpha": "CIV", "iso_alpha_2": "ci", "flag": "🇨🇮"},
-    "pol": {"name": "Poland", "iso_alpha": "POL", "iso_alpha_2": "pl", "flag": "🇵🇱"},
-    "omn": {"name": "Oman", "iso_alpha": "OMN", "iso_alpha_2": "om", "flag": "🇴🇲"},
-    "ita": {"name": "Italy", "iso_alpha": "ITA", "iso_alpha_2": "it", "flag": "🇮🇹"},
-    "phl": {"name": "Philippines", "iso_alpha": "PHL", "iso_alpha_2": "ph", "flag": "🇵🇭"},
-    "ecu": {"name": "Ecuador", "iso_alpha": "ECU", "iso_alpha_2": "ec", "flag": "🇪🇨"},
-    "bfa": {"name": "Burkina Faso", "iso_alpha": "BFA", "iso_alpha_2": "bf", "flag": "🇧🇫"},
-    "nzl": {"name": "New Zealand", "iso_alpha": "NZL", "iso_alpha_2": "nz", "flag": "🇳🇿"},
-    "gab": {"name": "Gabon", "iso_alpha": "GAB", "iso_alpha_2": "ga", "flag": "🇬🇦"},
-    "gin": {"name": "Guinea", "iso_alpha": "GIN", "iso_alpha_2": "gn", "flag": "🇬🇳"},
-    "gbr": {"name": "United Kingdom", "iso_alpha": "GBR", "iso_alpha_2": "gb", "flag": "🇬🇧"},
-    "uga": {"name": "Uganda", "iso_alpha": "UGA", "iso_alpha_2": "ug", "flag": "🇺🇬"},
-}
-
-
-# Column Names
-ITEM_COLUMN = "item"
-TIME_COLUMN = "startdate"
-VALUE_COLUMN = "value"
+from aggregates import (
+    build_cross_sections, build_global_cube, changed_rows, comparison_matrix, comparison_ranking,
+    cross_section_frame, cross_section_history, global_averages, overview_table, patch_cross_sections,
+    patch_global_cube,
+)
+from analytics import build_indicator_array, correlation_matrix, strongest_pairs, trend_slopes, yoy_volatility
+from changes import change_table, pairwise_changes, value_matrix
+from config import (
+    COMPARISON_COLUMNS, COUNTRY_COLUMN, COUNTRY_MAPPING, DATASET_GLOB, DATASET_MEMORY_MAP, DATASET_SOURCE,
+    DEBUG_PANEL, FLAG_CACHE_DIR, FLAG_DIR, FLAG_IMAGE_BASE_URL, FLAG_THUMBNAIL_DIR, GITHUB_RAW_BASE_URL,
+    HTTP_CACHE_DIR, INCLUDED_ITEMS, INGEST_STATE_PATH, ITEM_COLUMN, LOCAL_DATASET_DIR, MANIFEST_PATH,
+    METRICS_LOG, PANEL_PATH, PROFILE_TOP_FUNCTIONS, STORE_MEMORY_BUDGET_MB, TIME_COLUMN, VALUE_COLUMN,
+    dataset_country_code, in_year_range,
+)
+from fetcher import HttpFetcher
+from figures import (
+    COMPARISON_LAYOUTS, animated_map_figure, comparison_figure, correlation_figure, figure_from_json,
+    figure_json, global_map_figure, item_time_series_figure, time_series_figure,
+)
+from flags import FlagAssets
+from metrics import METRICS, cache_counts, enable_metrics_log, timed
+from ingest import changed_countries, ingest, load_state
+from panel import Panel, load_manifest, load_panel, manifest_options
+from preprocessing import READ_CSV_OPTIONS, preprocess_data
+from ranking import build_rank_index
+from sources import SOURCE_REMOTE, make_dataset_source
+from store import DataStore
 
 # Functions
 def format_dataset_name(file_name):
-    country_code = file_name.split('_')[-1].split('.')[0].lower()
+    country_code = dataset_country_code(file_name)
     country_info = COUNTRY_MAPPING.get(country_code)
     if country_info:
         return f"{country_info['name']} {country_info['flag']}"
     return file_name.replace('.csv', '').capitalize()
 
-def get_country_code_by_name(display_name):
-    for code, info in COUNTRY_MAPPING.items():
-        if info['name'] in display_name:
-            return code
-    return None
+def instrumented(cache, name, **options):
+    # st.cache_data / st.cache_resource that counts calls and misses (the body only runs on a miss)
+    # and times every miss as stage `name`
+    def decorator(function):
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            METRICS.count(f"cache.{name}.misses")
+            with METRICS.timer(name):
+                return function(*args, **kwargs)
+        cached = cache(**options)(compute)
+
+        @functools.wraps(function)
+        def lookup(*args, **kwargs):
+            METRICS.count(f"cache.{name}.calls")
+            return cached(*args, **kwargs)
+        lookup.clear = cached.clear
+        return lookup
+    return decorator
+
+dataset_source = make_dataset_source(
+    DATASET_SOURCE, LOCAL_DATASET_DIR, GITHUB_RAW_BASE_URL, DATASET_MEMORY_MAP, HTTP_CACHE_DIR
+)
 
-def preprocess_value(value):
-    if isinstance(value, str) and (value.startswith('<') or value.startswith('>')):
-        return float(value[1:].strip())
+@instrumented(st.cache_data, "read_csv")
+def fetch_csv_from_github(file_name):
     try:
-        return float(value)
-    except ValueError:
+        return dataset_source.read_csv(file_name, **READ_CSV_OPTIONS)
+    except (OSError, requests.RequestException) as e:
+        st.error(f"Error fetching {file_name}: {e}")
+        return None
+    except pd.errors.ParserError as e:
+        st.error(f"Error parsing CSV from {file_name}: {e}")
         return None
 
-def clean_dates(date):
+@instrumented(st.cache_resource, "panel")
+def get_panel():
     try:
-        return datetime.strptime(date, "%Y-%m-%d").date()
-    except (ValueError, TypeError):
+        if DATASET_SOURCE == SOURCE_REMOTE:
+            return load_panel(PANEL_PATH, dataset_source, LOCAL_DATASET_DIR)
+        # Only new and changed country files are parsed
+        return ingest(dataset_source)[0]
+    except (OSError, requests.RequestException, ValueError) as e:
+        st.warning(f"Could not load the combined dataset, reading country files individually: {e}")
         return None
 
-@st.cache_data
-def fetch_csv_from_github(file_name):
-    url = GITHUB_RAW_BASE_URL + file_name
+@st.cache_resource(show_spinner=False)
+def get_store():
+    return DataStore(get_panel(), STORE_MEMORY_BUDGET_MB * 2 ** 20, ingest_state())
+
+def ingest_state():
+    # (mtime, content) of the ingest state file, None without one
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return pd.read_csv(StringIO(response.text))
-    except requests.RequestException as e:
-        st.error(f"Error fetching {file_name}: {e}")
+        return os.stat(INGEST_STATE_PATH).st_mtime_ns, load_state(INGEST_STATE_PATH)
+    except OSError:
         return None
-    except pd.errors.ParserError as e:
-        st.error(f"Error parsing CSV from {file_name}: {e}")
+
+# Store results that belong to one country, keyed by (file_name, ...)
+COUNTRY_RESULTS = ["country_data", "value_matrix"]
+
+def apply_ingest(store, panel, countries):
+    # Patch the process-wide data for the countries that changed, instead of clearing every cache
+    old_data = store.panel.to_frame(INCLUDED_ITEMS)
+    data = panel.to_frame(INCLUDED_ITEMS)
+    changed = changed_rows(
+        old_data[old_data[COUNTRY_COLUMN].isin(countries)], data[data[COUNTRY_COLUMN].isin(countries)]
+    )
+
+    def stale(name, key):
+        if name.startswith("figure."):
+            return figure_is_stale(key, countries)
+        # Analytics of any item selection involve every country
+        return name in ANALYTICS or (name in COUNTRY_RESULTS and dataset_country_code(key[0]) in countries)
+
+    store.update(panel, {
+        "combined_data": lambda _: data,
+        "global_cube": lambda cube: patch_global_cube(cube, data, changed),
+        "cross_sections": lambda cross_sections: patch_cross_sections(cross_sections, data, list(countries)),
+        "rank_index": lambda _: build_rank_index(data),
+        "manifest": lambda _: load_manifest(MANIFEST_PATH, panel),
+        "indicator_array": lambda _: build_indicator_array(panel.to_frame()),
+    }, stale)
+
+@timed("sync_ingest")
+def sync_ingest():
+    # Pick up a panel re-ingested since this process loaded it (nightly `python ingest.py` or the debug panel)
+    store = get_store()
+    if store.panel is None or store.state is None or store.state == ingest_state():
+        return
+    with store.update_lock:
+        state = ingest_state()
+        if state is None or state == store.state:
+            return  # another session got here first
+        countries = changed_countries(store.state[1], state[1])
+        if countries:
+            apply_ingest(store, Panel.load(PANEL_PATH), countries)
+        store.state = state
+
+def read_country_data(file_name, items):
+    panel = get_store().panel
+    country_code = dataset_country_code(file_name)
+    if panel is not None and country_code in panel.country_index:
+        return panel.country_frame(country_code, list(items))
+    data = fetch_csv_from_github(file_name)
+    return preprocess_data(data, list(items)) if data is not None else None
+
+def load_country_data(file_name, items=tuple(INCLUDED_ITEMS)):
+    # The same frame for every session, from the process-wide store (st.cache_data would unpickle a copy per hit)
+    return get_store().get("country_data", (file_name, items), lambda: read_country_data(file_name, items))
+
+# Process-wide data, patched in place by apply_ingest
+def get_manifest():
+    panel = get_store().panel
+    if panel is None:
         return None
+    return get_store().get("manifest", None, lambda: load_manifest(MANIFEST_PATH, panel))
+
+def read_combined_data():
+    panel = get_store().panel
+    if panel is not None:
+        return panel.to_frame(INCLUDED_ITEMS)
+    return pd.concat([
+        load_country_data(file["file"]).assign(**{COUNTRY_COLUMN: dataset_country_code(file["file"])})
+        for file in dataset_files
+    ])
+
+def get_combined_data():
+    # Long (country, item, startdate, value) table of every dataset
+    return get_store().get("combined_data", None, read_combined_data)
+
+def get_global_cube():
+    return get_store().get("global_cube", None, lambda: build_global_cube(get_combined_data()))
+
+def get_rank_index():
+    return get_store().get("rank_index", None, lambda: build_rank_index(get_combined_data()))
+
+def get_cross_sections():
+    return get_store().get("cross_sections", None, lambda: build_cross_sections(get_combined_data()))
+
+def read_indicator_data():
+    # Every item the panel holds, not only INCLUDED_ITEMS
+    panel = get_store().panel
+    return panel.to_frame() if panel is not None else get_combined_data()
+
+def get_indicator_array():
+    # country x item x year array of every value
+    return get_store().get("indicator_array", None, lambda: build_indicator_array(read_indicator_data()))
+
+# Cross-indicator results, stored per item selection (a sorted tuple of items)
+ANALYTICS = {
+    "trend_slopes": trend_slopes,
+    "yoy_volatility": yoy_volatility,
+    "correlations": correlation_matrix,
+    "within_country_correlations": lambda array: correlation_matrix(array, within_countries=True),
+}
+
+def get_analytics(name, items):
+    return get_store().get(name, items, lambda: ANALYTICS[name](get_indicator_array().subset(items)))
 
-def preprocess_data(data):
-    data.columns = data.columns.str.lower().str.strip()
-    if TIME_COLUMN in data.columns:
-        data[TIME_COLUMN] = data[TIME_COLUMN].apply(clean_dates)
-        data = data[data[TIME_COLUMN].notna()]
-    if VALUE_COLUMN in data.columns:
-        data[VALUE_COLUMN] = data[VALUE_COLUMN].apply(preprocess_value)
-    if ITEM_COLUMN in data.columns:
-        data = data[data[ITEM_COLUMN].isin(INCLUDED_ITEMS)]  # Filter only included items
-    return data
+def item_history(item):
+    history = cross_section_history(get_cross_sections(), item)
+    return history[[in_year_range(date) for date in history[TIME_COLUMN]]]
 
+@timed("calculate_global_averages")
 def calculate_global_averages(date):
-    averages = {}
-    for file in dataset_files:
-        country_data = preprocess_data(fetch_csv_from_github(file["file"]))
-        if country_data is not None and not country_data.empty:
-            filtered_data = country_data[country_data[TIME_COLUMN] == date]
-            for _, row in filtered_data.iterrows():
-                item = row[ITEM_COLUMN]
-                value = row[VALUE_COLUMN]
-                if pd.notna(value):
-                    if item not in averages:
-                        averages[item] = []
-                    averages[item].append(value)
-    # Calculate average for each item
-    return {item: sum(values) / len(values) for item, values in averages.items()}
+    return global_averages(get_global_cube(), date)
+
+@st.cache_resource(show_spinner=False)
+def get_flag_assets():
+    return FlagAssets(
+        FLAG_DIR, HttpFetcher(FLAG_IMAGE_BASE_URL, FLAG_CACHE_DIR), FLAG_THUMBNAIL_DIR, FLAG_IMAGE_BASE_URL
+    )
+
+def show_flag(country_code, width, caption=""):
+    iso_alpha_2 = COUNTRY_MAPPING[country_code]['iso_alpha_2']
+    st.image(get_flag_assets().thumbnail(iso_alpha_2, width), width=width, caption=caption)
+
+# Figures are stored as the JSON sent to the browser, one per (view, country, item): country is a country
+# code, a tuple of codes (comparisons) or None (figures of every country), item anything else the figure
+# depends on. A hit is one JSON parse, where st.cache_data unpickled a copy of the whole Figure.
+def show_figure(view, country, item, build):
+    spec = get_store().get(f"figure.{view}", (country, item), lambda: figure_json(build()))
+    METRICS.count("figure.bytes", len(spec))
+    st.plotly_chart(figure_from_json(spec))
+
+def figure_is_stale(key, countries):
+    # After `countries` were re-ingested
+    country = key[0]
+    return country is None or not countries.isdisjoint(country if isinstance(country, tuple) else [country])
+
+def item_figure(file_name, item, title):
+    data = load_country_data(file_name)
+    return item_time_series_figure(data[data[ITEM_COLUMN] == item], title)
+
+def get_value_matrix(file_name):
+    return get_store().get("value_matrix", (file_name,), lambda: value_matrix(load_country_data(file_name)))
+
+def percentage_change_text(percentage_change, starting_date, ending_date):
+    if pd.notna(percentage_change):
+        if percentage_change > 0:
+            return f"**<span style='color:lime;'>Percentage change from {starting_date} to {ending_date}: +{percentage_change:.2f}% ↑</span>**"
+        return f"**<span style='color:red;'>Percentage change from {starting_date} to {ending_date}: {percentage_change:.2f}% ↓</span>**"
+    return "**Change: N/A (Data Missing)**"
+
+@st.cache_resource
+def get_metrics_log():
+    # One handler per process, however many sessions rerun the script
+    return enable_metrics_log(METRICS_LOG)
+
+def timer_table(timers):
+    table = pd.DataFrame.from_dict(timers, orient="index", columns=["count", "total"])
+    table["total ms"] = table.pop("total") * 1000
+    table["mean ms"] = table["total ms"] / table["count"]
+    return table.sort_values("total ms", ascending=False)
+
+def debug_panel(this_run, profiler):
+    if profiler is not None:
+        profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        profiler.create_stats()
+        st.session_state["profile"] = (report.getvalue(), marshal.dumps(profiler.stats))
+
+    totals = METRICS.snapshot()
+    with st.sidebar.expander("Debug: timings and caches"):
+        st.caption("This run (fragment reruns are not included)")
+        st.dataframe(timer_table(this_run["timers"]))
+        st.caption("Since the process started or the last reset")
+        st.dataframe(timer_table(totals["timers"]))
+        store = get_store()
+        st.caption(f"Data store: {store.nbytes / 2 ** 20:.1f} of {store.budget_bytes / 2 ** 20:.0f} MiB "
+                   f"in {len(store)} results")
+        caches = pd.DataFrame.from_dict(cache_counts(totals), orient="index", columns=["calls", "misses"])
+        caches["hit rate"] = 1 - caches["misses"] / caches["calls"]
+        st.dataframe(caches)
+        st.dataframe(pd.Series({
+            name: value for name, value in totals["counters"].items() if not name.startswith("cache.")
+        }, name="value", dtype="int64"))
+
+        st.download_button("Export metrics (JSON)", json.dumps(totals), file_name="metrics.json")
+        if DATASET_SOURCE != SOURCE_REMOTE and st.button("Ingest changed files"):
+            plan, countries = ingest(dataset_source)[1:]
+            sync_ingest()
+            st.write(f"Re-read {len(countries)} countries ({', '.join(sorted(countries)) or 'none'}); "
+                     f"{len(plan['duplicates'])} duplicate and {len(plan['untracked'])} untracked files skipped")
+        if st.button("Reset metrics"):
+            METRICS.reset()
+        if st.button("Profile the next run"):
+            st.session_state["profile_next_run"] = True
+        if "profile" in st.session_state:
+            report, stats = st.session_state["profile"]
+            st.text(report)
+            st.download_button("Download profile (.prof)", stats, file_name="dashboard.prof")
+
+# Fragments: each reruns on its own when one of its widgets changes, not the whole script
+@st.fragment
+def percentage_change_panel(file_name, valid_dates, chart_layout):
+    # Add date range selection
+    with st.sidebar:
+        st.subheader("Percentage change calculator")
+        starting_date = st.selectbox("Starting Date", options=valid_dates)
+        ending_date = st.selectbox("Ending Date", options=valid_dates[::-1])  # Reverse order for Ending Date
+
+    if not (starting_date and ending_date):
+        return
+    # Ensure the dates are valid
+    if starting_date > ending_date:
+        st.error("Starting Date must be earlier than Ending Date.")
+        return
+
+    # Changes for every item between the two dates in one vectorized pass
+    matrix = get_value_matrix(file_name)
+    with METRICS.timer("change_table"):
+        changes = change_table(matrix, starting_date, ending_date)
+    items = sorted(matrix.columns)
+    for item in items:
+        change_text = percentage_change_text(changes.loc[item, "percentage_change"], starting_date, ending_date)
+        if chart_layout == "Single figure":
+            st.markdown(f"**{item}**  \n{change_text}", unsafe_allow_html=True)
+        else:
+            show_figure("item_time_series", dataset_country_code(file_name), item,
+                        lambda: item_figure(file_name, item, f"Time Series of {item}"))
+            st.markdown(change_text, unsafe_allow_html=True)
+
+    with st.expander("All changes"):
+        # Fixed labels: with equal dates, dated ones would be duplicate column names
+        st.caption(f"Start value on {starting_date}, end value on {ending_date}")
+        st.dataframe(changes.rename(columns={
+            "start": "Start value", "end": "End value",
+            "absolute_change": "Change", "percentage_change": "Change (%)", "cagr": "CAGR (%)",
+        }))
+        pairwise_item = st.selectbox("Change between every pair of dates for", options=items)
+        st.dataframe(pairwise_changes(matrix, pairwise_item))
+
+@st.fragment
+def comparison_panel(country_codes):
+    cross_sections = get_cross_sections()
+    selected_item = st.selectbox(
+        "Select an item for Comparison",
+        options=sorted(cross_sections.index.get_level_values(ITEM_COLUMN).unique())
+    )
+    # Every selected country in one lookup: a date x country matrix of the item
+    matrix = comparison_matrix(cross_sections, selected_item, country_codes)
+    comparison_date = st.selectbox(
+        "Select a date for Comparison",
+        options=[date for date in matrix.dropna(how="all").index if in_year_range(date)]
+    )
+
+    if not comparison_date:
+        st.warning("Data not available for the selected countries or item.")
+        return
+    st.write(f"### {selected_item} in {comparison_date}:")
+    ranking = comparison_ranking(matrix, comparison_date)
+
+    # Flag and metric for each country, COMPARISON_COLUMNS per row
+    for start in range(0, len(country_codes), COMPARISON_COLUMNS):
+        for col, country_code in zip(st.columns(COMPARISON_COLUMNS), country_codes[start:start + COMPARISON_COLUMNS]):
+            with col:
+                show_flag(country_code, 100)
+                value = ranking.loc[country_code, "Value"]
+                st.metric(f"{COUNTRY_MAPPING[country_code]['name']} {COUNTRY_MAPPING[country_code]['flag']}",
+                          f"{value:,.2f}" if pd.notna(value) else "N/A")
+
+    layout = st.radio("Chart layout", COMPARISON_LAYOUTS, horizontal=True)
+    show_figure("comparison", tuple(country_codes), (selected_item, layout), lambda: comparison_figure(
+        matrix.rename(columns=lambda code: COUNTRY_MAPPING[code]["name"]), selected_item, layout
+    ))
+    st.dataframe(ranking.rename(index=lambda code: COUNTRY_MAPPING[code]["name"]).rename_axis("Country"))
+
+@st.fragment
+def global_map_panel(item_options, date_options):
+    with st.sidebar:
+        selected_item = st.selectbox("Select an Item for Global Analysis", options=[""] + item_options)
+        map_mode = st.radio("Map mode", ["Single date", "All years (animated)"])
+        if map_mode == "Single date":
+            selected_date = st.selectbox("Select a Date for Global Analysis", options=[""] + date_options)
+
+    if map_mode == "All years (animated)":
+        if selected_item:
+            # One cached figure per item; the year slider plays in the browser without reruns
+            st.subheader(f"Global Analysis of {selected_item}, all years")
+            show_figure("animated_map", None, selected_item,
+                        lambda: animated_map_figure(item_history(selected_item), selected_item))
+        else:
+            st.warning("Please select an item.")
+    elif selected_item and selected_date:
+        # The whole cross-section in one lookup
+        with METRICS.timer("cross_section_frame"):
+            map_df = cross_section_frame(get_cross_sections(), selected_item, selected_date)
+
+        if not map_df.empty:
+            st.subheader(f"Global Analysis of {selected_item} on {selected_date}")
+            show_figure("global_map", None, (selected_item, selected_date),
+                        lambda: global_map_figure(map_df, selected_item, selected_date))
+            st.markdown("  \n".join(
+                f"{row.country} {row.flag}: {row.value}" for row in map_df.itertuples(index=False)
+            ))
+        else:
+            st.warning("No data available for the selected item or date.")
+    else:
+        st.warning("Please select both an item and a date.")
+
+def country_names(table):
+    return table.rename(index=lambda code: COUNTRY_MAPPING.get(code, {}).get("name", code)).rename_axis("Country")
+
+@st.fragment
+def analytics_panel(items):
+    trends_tab, correlations_tab, volatility_tab = st.tabs(["Trends", "Correlations", "Volatility"])
+    with trends_tab:
+        st.caption("Change per year: least-squares slope over every year with a value")
+        st.dataframe(country_names(get_analytics("trend_slopes", items)))
+    with correlations_tab:
+        mode = st.radio("Correlate", ["Across countries and years", "Within countries, over time"], horizontal=True)
+        name = "correlations" if mode == "Across countries and years" else "within_country_correlations"
+        correlations = get_analytics(name, items)
+        show_figure("correlations", None, (items, name),
+                    lambda: correlation_figure(correlations, f"Correlation between indicators ({mode.lower()})"))
+        st.write("Strongest pairs")
+        st.dataframe(strongest_pairs(correlations), hide_index=True)
+    with volatility_tab:
+        st.caption("Standard deviation of the year-over-year change (%)")
+        st.dataframe(country_names(get_analytics("yoy_volatility", items)))
+
 # App Layout
+if METRICS_LOG:
+    get_metrics_log()
+run_started = time.perf_counter()
+run_metrics = METRICS.start_run()  # this session's stages only, not those of concurrent sessions
+profiler = None
+if st.session_state.pop("profile_next_run", False):
+    profiler = cProfile.Profile()
+    profiler.enable()
+
 st.title("Food Security Analysis Dashboard")
 st.write("Explore food security indicators across countries. \n All the data was collected from the HDX  \n M.Mandakhbayar ")
 
+# Combined dataset, built from the country files on first start and patched when they change
+sync_ingest()
+
 # Dataset List
 dataset_files = [{"file": file, "display": format_dataset_name(file)} for file in DATASET_GLOB]
 
 # Sidebar Navigation
 analysis_type = st.sidebar.selectbox(
     "Choose Analysis Type",
-    ["Select", "Time Series Analysis", "Comparison Analysis", "Country Overview", "Global Analysis"]
+    ["Select", "Time Series Analysis", "Comparison Analysis", "Country Overview", "Global Analysis",
+     "Indicator Analytics"]
 )
 
 # Dataset Selection for relevant analyses
@@ -283,68 +461,31 @@ if analysis_type in ["Time Series Analysis", "Country Overview"]:
         "Select a dataset", options=[d["display"] for d in dataset_files]
     )
     selected_dataset = next(d["file"] for d in dataset_files if d["display"] == selected_display)
-    selected_country_code = get_country_code_by_name(selected_display)
+    # From the file name: matching display names would take "Nigeria" for Niger
+    selected_country_code = dataset_country_code(selected_dataset)
 
 # Load Data
-data = fetch_csv_from_github(selected_dataset) if selected_dataset else None
-if data is not None:
-    data = preprocess_data(data)
+data = load_country_data(selected_dataset) if selected_dataset else None
 
 
 
 # Time Series Analysis
 if analysis_type == "Time Series Analysis" and selected_country_code:
-    st.image(f"{FLAG_IMAGE_BASE_URL}{COUNTRY_MAPPING[selected_country_code]['iso_alpha_2']}.svg", 
-         width=150, caption=COUNTRY_MAPPING[selected_country_code]['name'])
+    show_flag(selected_country_code, 150, COUNTRY_MAPPING[selected_country_code]['name'])
 
 
     if data is not None and all(col in data.columns for col in [ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN]):
-        # Filter dates between 2000 and 2020
-        valid_dates = sorted([date for date in data[TIME_COLUMN].unique() if 2000 <= date.year <= 2020])
+        # Filter dates between FIRST_YEAR and LAST_YEAR
+        valid_dates = sorted([date for date in data[TIME_COLUMN].unique() if in_year_range(date)])
 
-        # Add date range selection
-        st.sidebar.subheader("Percentage change calculator")
-        starting_date = st.sidebar.selectbox("Starting Date", options=valid_dates)
-        ending_date = st.sidebar.selectbox("Ending Date", options=valid_dates[::-1])  # Reverse order for Ending Date
+        chart_layout = st.sidebar.radio("Chart layout", ["Single figure", "One chart per item"])
 
-        if starting_date and ending_date:
-            st.subheader("Time Series Analysis for All Items")
-            
-            # Ensure the dates are valid
-            if starting_date > ending_date:
-                st.error("Starting Date must be earlier than Ending Date.")
-            else:
-                # Loop through all unique items
-                for item in sorted(data[ITEM_COLUMN].unique()):
-                    # Filter data for the specific item
-                    item_data = data[data[ITEM_COLUMN] == item]
-                    
-                    # Calculate percentage change
-                    starting_value = item_data[item_data[TIME_COLUMN] == starting_date][VALUE_COLUMN].values
-                    ending_value = item_data[item_data[TIME_COLUMN] == ending_date][VALUE_COLUMN].values
-
-                    if starting_value.size > 0 and ending_value.size > 0:
-                        percentage_change = ((ending_value[0] - starting_value[0]) / starting_value[0]) * 100
-                        if percentage_change > 0:
-                            change_text = f"**<span style='color:lime;'>Percentage change from {starting_date} to {ending_date}: +{percentage_change:.2f}% ↑</span>**"
-                        else:
-                            change_text = f"**<span style='color:red;'>Percentage change from {starting_date} to {ending_date}: {percentage_change:.2f}% ↓</span>**"
-                    else:
-                        change_text = "**Change: N/A (Data Missing)**"
-
-                    # Create and display the chart
-                    fig = px.line(
-                        item_data,
-                        x=TIME_COLUMN,
-                        y=VALUE_COLUMN,
-                        title=f"Time Series of {item}",
-                        labels={TIME_COLUMN: "Date", VALUE_COLUMN: "Value"},
-                    )
-                    fig.update_yaxes(range=[0, item_data[VALUE_COLUMN].max() * 1.1])  # Start Y-axis at 0
-                    
-                    # Display the chart and percentage change
-                    st.plotly_chart(fig)
-                    st.markdown(change_text, unsafe_allow_html=True)
+        st.subheader("Time Series Analysis for All Items")
+        if chart_layout == "Single figure":
+            # One cached figure per country; only the change texts depend on the dates
+            show_figure("time_series", selected_country_code, None,
+                        lambda: time_series_figure(load_country_data(selected_dataset)))
+        percentage_change_panel(selected_dataset, valid_dates, chart_layout)
     else:
         st.error("The dataset is missing required columns.")
 
@@ -353,182 +494,74 @@ if analysis_type == "Time Series Analysis" and selected_country_code:
 # Comparison Analysis
 elif analysis_type == "Comparison Analysis":
     st.subheader("Comparison Analysis")
-    dataset_1_display = st.sidebar.selectbox(
-        "Select Dataset 1", options=[d["display"] for d in dataset_files]
-    )
-    dataset_2_display = st.sidebar.selectbox(
-        "Select Dataset 2", options=[d["display"] for d in dataset_files]
+    selected_displays = st.sidebar.multiselect(
+        "Select countries", options=[d["display"] for d in dataset_files],
+        default=[d["display"] for d in dataset_files[:2]]
     )
 
-    if dataset_1_display and dataset_2_display:
-        dataset_1_file = next(d["file"] for d in dataset_files if d["display"] == dataset_1_display)
-        dataset_2_file = next(d["file"] for d in dataset_files if d["display"] == dataset_2_display)
-        country_1_code = get_country_code_by_name(dataset_1_display)
-        country_2_code = get_country_code_by_name(dataset_2_display)
-
-        data_1 = preprocess_data(fetch_csv_from_github(dataset_1_file))
-        data_2 = preprocess_data(fetch_csv_from_github(dataset_2_file))
-
-        if data_1 is not None and data_2 is not None:
-            selected_item = st.selectbox("Select an item for Comparison", options=sorted(data_1[ITEM_COLUMN].unique()))
-            comparison_date = st.selectbox(
-                "Select a date for Comparison",
-                options=sorted(date for date in data_1[TIME_COLUMN].unique() if 2000 <= date.year <= 2020)
-            )
-
-            if selected_item and comparison_date:
-                # Dynamic title showing the selected item and date
-                st.write(f"### {selected_item} in {comparison_date}:")
-
-                value_1 = data_1[(data_1[ITEM_COLUMN] == selected_item) & (data_1[TIME_COLUMN] == comparison_date)][VALUE_COLUMN].values
-                value_2 = data_2[(data_2[ITEM_COLUMN] == selected_item) & (data_2[TIME_COLUMN] == comparison_date)][VALUE_COLUMN].values
-
-                col1, col2 = st.columns(2)
-
-                if value_1.size > 0 and value_2.size > 0:
-                    # Display flag, metric, and time series for country 1
-                    with col1:
-                        st.image(f"{FLAG_IMAGE_BASE_URL}{COUNTRY_MAPPING[country_1_code]['iso_alpha_2']}.svg", 
-         width=100, caption="")
-                        st.metric(f"{COUNTRY_MAPPING[country_1_code]['name']} {COUNTRY_MAPPING[country_1_code]['flag']}",
-                                  f"{value_1[0]:,.2f}")
-
-                        # Time series for Dataset 1
-                        country_1_item_data = data_1[data_1[ITEM_COLUMN] == selected_item]
-                        fig_1 = px.line(
-                            country_1_item_data,
-                            x=TIME_COLUMN,
-                            y=VALUE_COLUMN,
-                            title=f"{COUNTRY_MAPPING[country_1_code]['name']} {selected_item} Time Series",
-                            labels={TIME_COLUMN: "Date", VALUE_COLUMN: "Value"}
-                        )
-                        fig_1.update_yaxes(range=[0, country_1_item_data[VALUE_COLUMN].max() * 1.1])  # Start Y-axis at 0
-                        st.plotly_chart(fig_1, use_container_width=True)
-
-                    # Display flag, metric, and time series for country 2
-                    with col2:
-                        st.image(f"{FLAG_IMAGE_BASE_URL}{COUNTRY_MAPPING[country_2_code]['iso_alpha_2']}.svg", 
-         width=100, caption="")
-
-                        st.metric(f"{COUNTRY_MAPPING[country_2_code]['name']} {COUNTRY_MAPPING[country_2_code]['flag']}",
-                                  f"{value_2[0]:,.2f}")
-
-                        # Time series for Dataset 2
-                        country_2_item_data = data_2[data_2[ITEM_COLUMN] == selected_item]
-                        fig_2 = px.line(
-                            country_2_item_data,
-                            x=TIME_COLUMN,
-                            y=VALUE_COLUMN,
-                            title=f"{COUNTRY_MAPPING[country_2_code]['name']} {selected_item} Time Series",
-                            labels={TIME_COLUMN: "Date", VALUE_COLUMN: "Value"}
-                        )
-                        fig_2.update_yaxes(range=[0, country_2_item_data[VALUE_COLUMN].max() * 1.1])  # Start Y-axis at 0
-                        st.plotly_chart(fig_2, use_container_width=True)
-                else:
-                    st.warning("Data not available for the selected date or item.")
+    if selected_displays:
+        display_files = {d["display"]: d["file"] for d in dataset_files}
+        comparison_panel([dataset_country_code(display_files[display]) for display in selected_displays])
+    else:
+        st.warning("Please select at least one country.")
 
 # Country Overview
 elif analysis_type == "Country Overview" and selected_country_code:
-    st.image(f"{FLAG_IMAGE_BASE_URL}{COUNTRY_MAPPING[selected_country_code]['iso_alpha_2']}.svg", 
-         width=150, caption=COUNTRY_MAPPING[selected_country_code]['name'])
+    show_flag(selected_country_code, 150, COUNTRY_MAPPING[selected_country_code]['name'])
 
     if data is not None:
         selected_date = st.sidebar.selectbox(
             "Select a date for Overview", 
-            options=sorted(date for date in data[TIME_COLUMN].unique() if 2000 <= date.year <= 2020)
+            options=sorted(date for date in data[TIME_COLUMN].unique() if in_year_range(date))
         )
         if selected_date:
             st.subheader(f"Country Overview on {selected_date}")
             
-            # Get the country's data for the selected date
-            overview_data = data[data[TIME_COLUMN] == selected_date]
-            
             # Calculate global averages for the selected date
             global_averages = calculate_global_averages(selected_date)
-            
-            # Prepare the table data
-            table_data = []
-            for _, row in overview_data.iterrows():
-                item = row[ITEM_COLUMN]
-                value = row[VALUE_COLUMN]
-                global_average = global_averages.get(item, None)
-                relative_to_average = (
-                    f"{((value - global_average) / global_average) * 100:.2f}%" if global_average else "N/A"
-                )
-                table_data.append({
-                    "Item": item,
-                    "Value": f"{value:,.2f}" if pd.notna(value) else "N/A",
-                    "Relative to Average": relative_to_average
-                })
-            
-            # Convert to DataFrame and display as a table
-            table_df = pd.DataFrame(table_data)
+
+            # Build the table for the country's data on the selected date
+            with METRICS.timer("overview_table"):
+                table_df = overview_table(data, selected_date, global_averages, get_rank_index())
             st.write(table_df)
 
 
 
 # Global Analysis
 elif analysis_type == "Global Analysis":
-    selected_item = st.sidebar.selectbox(
-        "Select an Item for Global Analysis",
-        options=[""] + sorted({
+    manifest = get_manifest()
+    if manifest is not None:
+        # Options come from the ingest-time manifest, no country data is read
+        item_options, date_options = manifest_options(manifest)
+        date_options = [date for date in date_options if in_year_range(date)]
+    else:
+        item_options = sorted({
             item
             for file in dataset_files
-            for item in preprocess_data(fetch_csv_from_github(file["file"]))[ITEM_COLUMN].unique()
+            for item in load_country_data(file["file"])[ITEM_COLUMN].unique()
         })
-    )
-    selected_date = st.sidebar.selectbox(
-        "Select a Date for Global Analysis",
-        options=[""] + sorted({
+        date_options = sorted({
             date for file in dataset_files
-            for date in preprocess_data(fetch_csv_from_github(file["file"]))[TIME_COLUMN].unique()
-            if 2000 <= date.year <= 2020  # Restrict to dates between 2000 and 2020
+            for date in load_country_data(file["file"])[TIME_COLUMN].unique()
+            if in_year_range(date)  # Restrict to FIRST_YEAR..LAST_YEAR
         })
+    global_map_panel(item_options, date_options)
+
+# Indicator Analytics
+elif analysis_type == "Indicator Analytics":
+    st.subheader("Indicator Analytics")
+    item_options = get_indicator_array().items.tolist()
+    selected_items = st.sidebar.multiselect(
+        "Select items", options=item_options, default=[item for item in INCLUDED_ITEMS if item in item_options]
     )
-
-    if selected_item and selected_date:
-        map_data = []
-
-        for file in dataset_files:
-            country_key = file["file"].split('_')[-1].split('.')[0].lower()
-            if country_key in COUNTRY_MAPPING:
-                country_info = COUNTRY_MAPPING[country_key]
-                country_data = preprocess_data(fetch_csv_from_github(file["file"]))
-                if country_data is not None and not country_data.empty:
-                    filtered_data = country_data[
-                        (country_data[TIME_COLUMN] == selected_date) &
-                        (country_data[ITEM_COLUMN] == selected_item)
-                    ]
-
-                    if not filtered_data.empty:
-                        try:
-                            value = float(filtered_data.iloc[0][VALUE_COLUMN])
-                            map_data.append({
-                                "iso_alpha": country_info["iso_alpha"],
-                                "country": country_info["name"],
-                                "flag": country_info["flag"],
-                                "value": value
-                            })
-                        except ValueError:
-                            pass
-
-        if map_data:
-            map_df = pd.DataFrame(map_data)
-
-            st.subheader(f"Global Analysis of {selected_item} on {selected_date}")
-            fig = px.choropleth(
-                map_df,
-                locations="iso_alpha",
-                color="value",
-                hover_name="country",
-                title=f"Global Map of {selected_item} ({selected_date})",
-                color_continuous_scale="Viridis",
-                hover_data={"iso_alpha": False, "value": True}  # Exclude 'iso_alpha' from hover
-            )
-            st.plotly_chart(fig)
-            for _, row in map_df.iterrows():
-                st.write(f"{row['country']} {row['flag']}: {row['value']}")
-        else:
-            st.warning("No data available for the selected item or date.")
+    if len(selected_items) >= 2:
+        analytics_panel(tuple(sorted(selected_items)))
     else:
-        st.warning("Please select both an item and a date.")
+        st.warning("Please select at least two items.")
+
+# Debug panel
+METRICS.observe(f"view.{analysis_type}", time.perf_counter() - run_started)
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    debug_panel(run_metrics, profiler)
+elif profiler is not None:
+    profiler.disable()
@@ -0,0 +1,232 @@
+import os
+
+# Included Items
+INCLUDED_ITEMS = [
+    "Average dietary energy supply adequacy (percent) (3-year average)",
+    "Average protein supply (g/cap/day) (3-year average)",
+    "Coefficient of variation of habitual caloric consumption distribution (real number)",
+    "Number of children under 5 years of age who are stunted (modeled estimates)",
+    "Percentage of children under 5 years of age who are stunted (modelled estimates) (percent)",
+    "Per capita food supply variability (kcal/cap/day)",
+    "Percentage of population using at least basic sanitation services (percent)",
+    "Percentage of population using safely managed drinking water services (percent)",
+    "Prevalence of low birthweight (percent)",
+    "Political stability and absence of violence/terrorism (index)",
+    "Prevalence of obesity in the adult population (18 years and older) (percent)",
+    "Prevalence of undernourishment (percent) (3-year average)",
+    "Share of dietary energy supply derived from cereals, roots and tubers (percent) (3-year average)"
+]
+
+# Constants
+FLAG_IMAGE_BASE_URL = "https://raw.githubusercontent.com/Manny735/Project-1/refs/heads/main/flags/"
+GITHUB_RAW_BASE_URL = os.environ.get(
+    "GITHUB_RAW_BASE_URL", "https://raw.githubusercontent.com/Manny735/Project-1/refs/heads/main/path-to-datasets/"
+)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCAL_DATASET_DIR = os.path.join(BASE_DIR, "path-to-datasets")
+ARTIFACT_DIR = os.path.join(BASE_DIR, "artifacts")
+PANEL_PATH = os.path.join(ARTIFACT_DIR, "panel.npz")
+MANIFEST_PATH = os.path.join(ARTIFACT_DIR, "manifest.json")
+INGEST_STATE_PATH = os.path.join(ARTIFACT_DIR, "ingest.json")
+HTTP_CACHE_DIR = os.path.join(ARTIFACT_DIR, "http-cache")
+FLAG_DIR = os.path.join(BASE_DIR, "flags")
+FLAG_CACHE_DIR = os.path.join(ARTIFACT_DIR, "flag-cache")
+FLAG_THUMBNAIL_DIR = os.path.join(FLAG_DIR, "thumbnails")  # committed; `python flags.py` builds any missing
+FLAG_THUMBNAIL_WIDTHS = [100, 150]  # the sizes show_flag is called with
+
+# Dataset source: "local" (local files, GitHub as fallback), "offline" or "remote"
+DATASET_SOURCE = os.environ.get("DATASET_SOURCE", "local")
+DATASET_MEMORY_MAP = os.environ.get("DATASET_MEMORY_MAP", "0") == "1"
+
+# Debug panel (also with ?debug=1 in the URL) and an optional JSON-lines log of stage timings ("-" for stderr)
+DEBUG_PANEL = os.environ.get("DASHBOARD_DEBUG", "0") == "1"
+METRICS_LOG = os.environ.get("METRICS_LOG")
+PROFILE_TOP_FUNCTIONS = 40
+
+# Comparison Analysis: country metrics per row
+COMPARISON_COLUMNS = 4
+
+# Memory budget of the derived results (country frames, value matrices) shared by all sessions
+STORE_MEMORY_BUDGET_MB = int(os.environ.get("STORE_MEMORY_BUDGET_MB", "256"))
+
+DATASET_GLOB = [
+    "suite-of-food-security-indicators_rus.csv",  # Russia
+    "suite-of-food-security-indicators_can.csv",  # Canada
+    "suite-of-food-security-indicators_chn.csv",  # China
+    "suite-of-food-security-indicators_usa.csv",  # United States
+    "suite-of-food-security-indicators_bra.csv",  # Brazil
+    "suite-of-food-security-indicators_aus.csv",  # Australia
+    "suite-of-food-security-indicators_ind.csv",  # India
+    "suite-of-food-security-indicators_arg.csv",  # Argentina
+    "suite-of-food-security-indicators_kaz.csv",  # Kazakhstan
+    "suite-of-food-security-indicators_dza.csv",  # Algeria
+    "suite-of-food-security-indicators_cod.csv",  # Congo (DR)
+    "suite-of-food-security-indicators_sau.csv",  # Saudi Arabia
+    "suite-of-food-security-indicators_mex.csv",  # Mexico
+    "suite-of-food-security-indicators_idn.csv",  # Indonesia
+    "suite-of-food-security-indicators_sdn.csv",  # Sudan
+    "suite-of-food-security-indicators_lby.csv",  # Libya
+    "suite-of-food-security-indicators_irn.csv",  # Iran
+    "suite-of-food-security-indicators_mng.csv",  # Mongolia
+    "suite-of-food-security-indicators_per.csv",  # Peru
+    "suite-of-food-security-indicators_tcd.csv",  # Chad
+    "suite-of-food-security-indicators_ner.csv",  # Niger
+    "suite-of-food-security-indicators_ago.csv",  # Angola
+    "suite-of-food-security-indicators_mli.csv",  # Mali
+    "suite-of-food-security-indicators_zaf.csv",  # South Africa
+    "suite-of-food-security-indicators_col.csv",  # Colombia
+    "suite-of-food-security-indicators_eth.csv",  # Ethiopia
+    "suite-of-food-security-indicators_bol.csv",  # Bolivia
+    "suite-of-food-security-indicators_mrt.csv",  # Mauritania
+    "suite-of-food-security-indicators_egy.csv",  # Egypt
+    "suite-of-food-security-indicators_tza.csv",  # Tanzania
+    "suite-of-food-security-indicators_nga.csv",  # Nigeria
+    "suite-of-food-security-indicators_ven.csv",  # Venezuela
+    "suite-of-food-security-indicators_pak.csv",  # Pakistan
+    "suite-of-food-security-indicators_moz.csv",  # Mozambique
+    "suite-of-food-security-indicators_tur.csv",  # Turkey
+    "suite-of-food-security-indicators_chl.csv",  # Chile
+    "suite-of-food-security-indicators_zmb.csv",  # Zambia
+    "suite-of-food-security-indicators_mmr.csv",  # Myanmar (Burma)
+    "suite-of-food-security-indicators_afg.csv",  # Afghanistan
+    "suite-of-food-security-indicators_ssd.csv",  # South Sudan
+    "suite-of-food-security-indicators_fra.csv",  # France (European part)
+    "suite-of-food-security-indicators_som.csv",  # Somalia
+    "suite-of-food-security-indicators_caf.csv",  # Central African Republic
+    "suite-of-food-security-indicators_ukr.csv",  # Ukraine
+    "suite-of-food-security-indicators_mdg.csv",  # Madagascar
+    "suite-of-food-security-indicators_bwa.csv",  # Botswana
+    "suite-of-food-security-indicators_ken.csv",  # Kenya
+    "suite-of-food-security-indicators_yem.csv",  # Yemen
+    "suite-of-food-security-indicators_tha.csv",  # Thailand
+    "suite-of-food-security-indicators_esp.csv",  # Spain
+    "suite-of-food-security-indicators_tkm.csv",  # Turkmenistan
+    "suite-of-food-security-indicators_cmr.csv",  # Cameroon
+    "suite-of-food-security-indicators_png.csv",  # Papua New Guinea
+    "suite-of-food-security-indicators_swe.csv",  # Sweden
+    "suite-of-food-security-indicators_uzb.csv",  # Uzbekistan
+    "suite-of-food-security-indicators_mar.csv",  # Morocco
+    "suite-of-food-security-indicators_irq.csv",  # Iraq
+    "suite-of-food-security-indicators_pry.csv",  # Paraguay
+    "suite-of-food-security-indicators_zwe.csv",  # Zimbabwe
+    "suite-of-food-security-indicators_jpn.csv",  # Japan
+    "suite-of-food-security-indicators_deu.csv",  # Germany
+    "suite-of-food-security-indicators_cog.csv",  # Republic of the Congo
+    "suite-of-food-security-indicators_fin.csv",  # Finland
+    "suite-of-food-security-indicators_vnm.csv",  # Vietnam
+    "suite-of-food-security-indicators_mys.csv",  # Malaysia
+    "suite-of-food-security-indicators_nor.csv",  # Norway
+    "suite-of-food-security-indicators_civ.csv",  # Ivory Coast
+    "suite-of-food-security-indicators_pol.csv",  # Poland
+    "suite-of-food-security-indicators_omn.csv",  # Oman
+    "suite-of-food-security-indicators_ita.csv",  # Italy
+    "suite-of-food-security-indicators_phl.csv",  # Philippines
+    "suite-of-food-security-indicators_ecu.csv",  # Ecuador
+    "suite-of-food-security-indicators_bfa.csv",  # Burkina Faso
+    "suite-of-food-security-indicators_nzl.csv",  # New Zealand
+    "suite-of-food-security-indicators_gab.csv",  # Gabon
+    "suite-of-food-security-indicators_gin.csv",  # Guinea
+    "suite-of-food-security-indicators_gbr.csv",  # United Kingdom
+    "suite-of-food-security-indicators_uga.csv"   # Uganda
+]
+
+COUNTRY_MAPPING = {
+    "rus": {"name": "Russia", "iso_alpha": "RUS", "iso_alpha_2": "ru", "flag": "🇷🇺"},
+    "can": {"name": "Canada", "iso_alpha": "CAN", "iso_alpha_2": "ca", "flag": "🇨🇦"},
+    "chn": {"name": "China", "iso_alpha": "CHN", "iso_alpha_2": "cn", "flag": "🇨🇳"},
+    "usa": {"name": "United States", "iso_alpha": "USA", "iso_alpha_2": "us", "flag": "🇺🇸"},
+    "bra": {"name": "Brazil", "iso_alpha": "BRA", "iso_alpha_2": "br", "flag": "🇧🇷"},
+    "aus": {"name": "Australia", "iso_alpha": "AUS", "iso_alpha_2": "au", "flag": "🇦🇺"},
+    "ind": {"name": "India", "iso_alpha": "IND", "iso_alpha_2": "in", "flag": "🇮🇳"},
+    "arg": {"name": "Argentina", "iso_alpha": "ARG", "iso_alpha_2": "ar", "flag": "🇦🇷"},
+    "kaz": {"name": "Kazakhstan", "iso_alpha": "KAZ", "iso_alpha_2": "kz", "flag": "🇰🇿"},
+    "dza": {"name": "Algeria", "iso_alpha": "DZA", "iso_alpha_2": "dz", "flag": "🇩🇿"},
+    "cod": {"name": "Congo (DR)", "iso_alpha": "COD", "iso_alpha_2": "cd", "flag": "🇨🇩"},
+    "sau": {"name": "Saudi Arabia", "iso_alpha": "SAU", "iso_alpha_2": "sa", "flag": "🇸🇦"},
+    "mex": {"name": "Mexico", "iso_alpha": "MEX", "iso_alpha_2": "mx", "flag": "🇲🇽"},
+    "idn": {"name": "Indonesia", "iso_alpha": "IDN", "iso_alpha_2": "id", "flag": "🇮🇩"},
+    "sdn": {"name": "Sudan", "iso_alpha": "SDN", "iso_alpha_2": "sd", "flag": "🇸🇩"},
+    "lby": {"name": "Libya", "iso_alpha": "LBY", "iso_alpha_2": "ly", "flag": "🇱🇾"},
+    "irn": {"name": "Iran", "iso_alpha": "IRN", "iso_alpha_2": "ir", "flag": "🇮🇷"},
+    "mng": {"name": "Mongolia", "iso_alpha": "MNG", "iso_alpha_2": "mn", "flag": "🇲🇳"},
+    "per": {"name": "Peru", "iso_alpha": "PER", "iso_alpha_2": "pe", "flag": "🇵🇪"},
+    "tcd": {"name": "Chad", "iso_alpha": "TCD", "iso_alpha_2": "td", "flag": "🇹🇩"},
+    "ner": {"name": "Niger", "iso_alpha": "NER", "iso_alpha_2": "ne", "flag": "🇳🇪"},
+    "ago": {"name": "Angola", "iso_alpha": "AGO", "iso_alpha_2": "ao", "flag": "🇦🇴"},
+    "mli": {"name": "Mali", "iso_alpha": "MLI", "iso_alpha_2": "ml", "flag": "🇲🇱"},
+    "zaf": {"name": "South Africa", "iso_alpha": "ZAF", "iso_alpha_2": "za", "flag": "🇿🇦"},
+    "col": {"name": "Colombia", "iso_alpha": "COL", "iso_alpha_2": "co", "flag": "🇨🇴"},
+    "eth": {"name": "Ethiopia", "iso_alpha": "ETH", "iso_alpha_2": "et", "flag": "🇪🇹"},
+    "bol": {"name": "Bolivia", "iso_alpha": "BOL", "iso_alpha_2": "bo", "flag": "🇧🇴"},
+    "mrt": {"name": "Mauritania", "iso_alpha": "MRT", "iso_alpha_2": "mr", "flag": "🇲🇷"},
+    "egy": {"name": "Egypt", "iso_alpha": "EGY", "iso_alpha_2": "eg", "flag": "🇪🇬"},
+    "tza": {"name": "Tanzania", "iso_alpha": "TZA", "iso_alpha_2": "tz", "flag": "🇹🇿"},
+    "nga": {"name": "Nigeria", "iso_alpha": "NGA", "iso_alpha_2": "ng", "flag": "🇳🇬"},
+    "ven": {"name": "Venezuela", "iso_alpha": "VEN", "iso_alpha_2": "ve", "flag": "🇻🇪"},
+    "nam": {"name": "Namibia", "iso_alpha": "NAM", "iso_alpha_2": "na", "flag": "🇳🇦"},
+    "pak": {"name": "Pakistan", "iso_alpha": "PAK", "iso_alpha_2": "pk", "flag": "🇵🇰"},
+    "moz": {"name": "Mozambique", "iso_alpha": "MOZ", "iso_alpha_2": "mz", "flag": "🇲🇿"},
+    "tur": {"name": "Turkey", "iso_alpha": "TUR", "iso_alpha_2": "tr", "flag": "🇹🇷"},
+    "chl": {"name": "Chile", "iso_alpha": "CHL", "iso_alpha_2": "cl", "flag": "🇨🇱"},
+    "zmb": {"name": "Zambia", "iso_alpha": "ZMB", "iso_alpha_2": "zm", "flag": "🇿🇲"},
+    "mmr": {"name": "Myanmar (Burma)", "iso_alpha": "MMR", "iso_alpha_2": "mm", "flag": "🇲🇲"},
+    "afg": {"name": "Afghanistan", "iso_alpha": "AFG", "iso_alpha_2": "af", "flag": "🇦🇫"},
+    "ssd": {"name": "South Sudan", "iso_alpha": "SSD", "iso_alpha_2": "ss", "flag": "🇸🇸"},
+    "fra": {"name": "France (European part)", "iso_alpha": "FRA", "iso_alpha_2": "fr", "flag": "🇫🇷"},
+    "som": {"name": "Somalia", "iso_alpha": "SOM", "iso_alpha_2": "so", "flag": "🇸🇴"},
+    "caf": {"name": "Central African Republic", "iso_alpha": "CAF", "iso_alpha_2": "cf", "flag": "🇨🇫"},
+    "ukr": {"name": "Ukraine", "iso_alpha": "UKR", "iso_alpha_2": "ua", "flag": "🇺🇦"},
+    "mdg": {"name": "Madagascar", "iso_alpha": "MDG", "iso_alpha_2": "mg", "flag": "🇲🇬"},
+    "bwa": {"name": "Botswana", "iso_alpha": "BWA", "iso_alpha_2": "bw", "flag": "🇧🇼"},
+    "ken": {"name": "Kenya", "iso_alpha": "KEN", "iso_alpha_2": "ke", "flag": "🇰🇪"},
+    "yem": {"name": "Yemen", "iso_alpha": "YEM", "iso_alpha_2": "ye", "flag": "🇾🇪"},
+    "tha": {"name": "Thailand", "iso_alpha": "THA", "iso_alpha_2": "th", "flag": "🇹🇭"},
+    "esp": {"name": "Spain", "iso_alpha": "ESP", "iso_alpha_2": "es", "flag": "🇪🇸"},
+    "tkm": {"name": "Turkmenistan", "iso_alpha": "TKM", "iso_alpha_2": "tm", "flag": "🇹🇲"},
+    "cmr": {"name": "Cameroon", "iso_alpha": "CMR", "iso_alpha_2": "cm", "flag": "🇨🇲"},
+    "png": {"name": "Papua New Guinea", "iso_alpha": "PNG", "iso_alpha_2": "pg", "flag": "🇵🇬"},
+    "swe": {"name": "Sweden", "iso_alpha": "SWE", "iso_alpha_2": "se", "flag": "🇸🇪"},
+    "uzb": {"name": "Uzbekistan", "iso_alpha": "UZB", "iso_alpha_2": "uz", "flag": "🇺🇿"},
+    "mar": {"name": "Morocco", "iso_alpha": "MAR", "iso_alpha_2": "ma", "flag": "🇲🇦"},
+    "irq": {"name": "Iraq", "iso_alpha": "IRQ", "iso_alpha_2": "iq", "flag": "🇮🇶"},
+    "pry": {"name": "Paraguay", "iso_alpha": "PRY", "iso_alpha_2": "py", "flag": "🇵🇾"},
+    "zwe": {"name": "Zimbabwe", "iso_alpha": "ZWE", "iso_alpha_2": "zw", "flag": "🇿🇼"},
+    "jpn": {"name": "Japan", "iso_alpha": "JPN", "iso_alpha_2": "jp", "flag": "🇯🇵"},
+    "deu": {"name": "Germany", "iso_alpha": "DEU", "iso_alpha_2": "de", "flag": "🇩🇪"},
+    "cog": {"name": "Republic of the Congo", "iso_alpha": "COG", "iso_alpha_2": "cg", "flag": "🇨🇬"},
+    "fin": {"name": "Finland", "iso_alpha": "FIN", "iso_alpha_2": "fi", "flag": "🇫🇮"},
+    "vnm": {"name": "Vietnam", "iso_alpha": "VNM", "iso_alpha_2": "vn", "flag": "🇻🇳"},
+    "mys": {"name": "Malaysia", "iso_alpha": "MYS", "iso_alpha_2": "my", "flag": "🇲🇾"},
+    "nor": {"name": "Norway", "iso_alpha": "NOR", "iso_alpha_2": "no", "flag": "🇳🇴"},
+    "civ": {"name": "Ivory Coast", "iso_alpha": "CIV", "iso_alpha_2": "ci", "flag": "🇨🇮"},
+    "pol": {"name": "Poland", "iso_alpha": "POL", "iso_alpha_2": "pl", "flag": "🇵🇱"},
+    "omn": {"name": "Oman", "iso_alpha": "OMN", "iso_alpha_2": "om", "flag": "🇴🇲"},
+    "ita": {"name": "Italy", "iso_alpha": "ITA", "iso_alpha_2": "it", "flag": "🇮🇹"},
+    "phl": {"name": "Philippines", "iso_alpha": "PHL", "iso_alpha_2": "ph", "flag": "🇵🇭"},
+    "ecu": {"name": "Ecuador", "iso_alpha": "ECU", "iso_alpha_2": "ec", "flag": "🇪🇨"},
+    "bfa": {"name": "Burkina Faso", "iso_alpha": "BFA", "iso_alpha_2": "bf", "flag": "🇧🇫"},
+    "nzl": {"name": "New Zealand", "iso_alpha": "NZL", "iso_alpha_2": "nz", "flag": "🇳🇿"},
+    "gab": {"name": "Gabon", "iso_alpha": "GAB", "iso_alpha_2": "ga", "flag": "🇬🇦"},
+    "gin": {"name": "Guinea", "iso_alpha": "GIN", "iso_alpha_2": "gn", "flag": "🇬🇳"},
+    "gbr": {"name": "United Kingdom", "iso_alpha": "GBR", "iso_alpha_2": "gb", "flag": "🇬🇧"},
+    "uga": {"name": "Uganda", "iso_alpha": "UGA", "iso_alpha_2": "ug", "flag": "🇺🇬"},
+}
+
+
+# Years offered in the date selectors
+FIRST_YEAR = 2000
+LAST_YEAR = 2020
+
+# Column Names
+COUNTRY_COLUMN = "country"
+ITEM_COLUMN = "item"
+TIME_COLUMN = "startdate"
+VALUE_COLUMN = "value"
+
+
+def dataset_country_code(file_name):
+    return file_name.split('_')[-1].split('.')[0].lower()
+
+def in_year_range(date):
+    # Whether a date is offered in the date selectors (and in the batch reports)
+    return FIRST_YEAR <= date.year <= LAST_YEAR
@@ -0,0 +1,106 @@
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import METRICS
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+_UMASK = os.umask(0)  # read once at import: umask() can only be read by setting it
+os.umask(_UMASK)
+
+
+def _max_age(response):
+    match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    return int(match.group(1)) if match else 0
+
+def write_atomic(path, data):
+    # A temp file of its own per call: sessions of one process may write the same path at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)  # mkstemp creates it 0600; keep the mode open() would give
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class HttpFetcher:
+    # Pooled, retrying GETs against one base URL. With a cache_dir, bodies are kept on disk and
+    # revalidated with If-None-Match, so an unchanged file costs a 304 (or nothing while max-age holds).
+    def __init__(self, base_url, cache_dir=None, timeout=30, max_workers=8, retries=3, backoff_factor=0.5):
+        self.base_url = base_url
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_workers = max_workers
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_paths(self, name):
+        body_path = os.path.join(self.cache_dir, name)
+        return body_path, body_path + ".json"
+
+    def _read_cache(self, name):
+        if not self.cache_dir:
+            return None, None
+        body_path, meta_path = self._cache_paths(name)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return f.read(), meta
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_cache(self, name, body, meta):
+        if not self.cache_dir:
+            return
+        body_path, meta_path = self._cache_paths(name)
+        if body is not None:
+            write_atomic(body_path, body)
+        write_atomic(meta_path, json.dumps(meta).encode())
+
+    def fetch(self, name):
+        body, meta = self._read_cache(name)
+        if body is not None and time.time() < meta["fetched_at"] + meta["max_age"]:
+            METRICS.count("http.fresh")
+            return body
+        headers = {"If-None-Match": meta["etag"]} if body is not None and meta.get("etag") else {}
+        with METRICS.timer("http.get"):
+            response = self.session.get(self.base_url + name, headers=headers, timeout=self.timeout)
+        METRICS.count("http.requests")
+        if response.status_code == 304 and body is not None:
+            METRICS.count("http.not_modified")
+            self._write_cache(name, None, dict(meta, fetched_at=time.time(), max_age=_max_age(response)))
+            return body
+        response.raise_for_status()
+        METRICS.count("http.bytes", len(response.content))
+        meta = {"etag": response.headers.get("ETag"), "fetched_at": time.time(), "max_age": _max_age(response)}
+        self._write_cache(name, response.content, meta)
+        return response.content
+
+    def fetch_many(self, names):
+        # Returns ({name: body}, {name: exception}) for the names that succeeded and failed
+        bodies, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {name: pool.submit(self.fetch, name) for name in names}
+            for name, future in futures.items():
+                try:
+                    bodies[name] = future.result()
+                except (OSError, requests.RequestException) as e:
+                    errors[name] = e
+        return bodies, errors
@@ -0,0 +1,177 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from config import ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN
+
+SUBPLOT_HEIGHT = 300  # px per item in the combined time series figure
+SUBPLOT_GAP = 80      # px between subplots, room for the subplot title
+
+# Comparison layouts
+COMPARISON_OVERLAID = "Overlaid"
+COMPARISON_SMALL_MULTIPLES = "Small multiples"
+COMPARISON_LAYOUTS = [COMPARISON_OVERLAID, COMPARISON_SMALL_MULTIPLES]
+SMALL_MULTIPLE_COLUMNS = 4
+SMALL_MULTIPLE_HEIGHT = 220  # px per row of small multiples
+
+# Payload: figures with more line points than WEBGL_POINTS draw with WebGL (Scattergl) instead of SVG,
+# and a line longer than MAX_LINE_POINTS is downsampled to that many points before it is sent
+WEBGL_POINTS = 2000
+MAX_LINE_POINTS = 1000
+
+
+def lttb(x, y, threshold):
+    # Indices of `threshold` points that keep the visual shape of the line (Largest-Triangle-Three-Buckets):
+    # first and last point, then per bucket the point forming the largest triangle with the point kept
+    # before it and the average of the next bucket. x must be increasing.
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket == threshold - 3:
+            next_x, next_y = x[n - 1], y[n - 1]
+        else:
+            next_end = edges[bucket + 2]
+            next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(areas))
+        kept[bucket + 1] = a
+    return kept
+
+def line_trace(x, y, webgl=False, **options):
+    # Scatter line of (x, y), as Scattergl when webgl; longer than MAX_LINE_POINTS it is downsampled
+    # with LTTB (missing values are then skipped instead of leaving a gap)
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    dates = x.dtype.kind in "OM"
+    if dates:
+        x = np.asarray(pd.to_datetime(x)).astype("datetime64[D]")
+    if len(x) > MAX_LINE_POINTS:
+        present = ~np.isnan(y)
+        x, y = x[present], y[present]
+        kept = lttb(x.astype(np.float64), y, MAX_LINE_POINTS)
+        x, y = x[kept], y[kept]
+    if dates:
+        # "YYYY-MM-DD" strings: the shortest JSON, and plotly validates them far faster than date objects
+        x = np.datetime_as_string(x, unit="D")
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(x=x, y=y, mode="lines", **options)
+
+def figure_json(fig):
+    # What st.plotly_chart sends to the browser, serialized once
+    return pio.to_json(fig, validate=False)
+
+def figure_from_json(spec):
+    # Back to a Figure for st.plotly_chart; the spec came from figure_json, so validating it again is skipped
+    return go.Figure(json.loads(spec), _validate=False)
+
+def _drop_unused_customdata(fig):
+    # plotly express puts every hover_data column in customdata, also those the hovertemplate leaves out
+    for trace in [*fig.data, *(trace for frame in fig.frames for trace in frame.data)]:
+        if "customdata" not in (trace.hovertemplate or ""):
+            trace.customdata = None
+    return fig
+
+def time_series_figure(data):
+    # One row per item, each with its own y-axis starting at 0, like the per-item charts
+    items = sorted(data[ITEM_COLUMN].unique())
+    webgl = len(data) > WEBGL_POINTS
+    height = SUBPLOT_HEIGHT * max(len(items), 1)
+    fig = make_subplots(
+        rows=max(len(items), 1), cols=1,
+        subplot_titles=[f"Time Series of {item}" for item in items],
+        vertical_spacing=SUBPLOT_GAP / height if len(items) > 1 else 0,
+    )
+    traces, axes = [], {}
+    for row, (item, item_data) in enumerate(data.groupby(ITEM_COLUMN, sort=True), start=1):
+        traces.append(line_trace(
+            item_data[TIME_COLUMN], item_data[VALUE_COLUMN], webgl, name=item,
+            hovertemplate="Date=%{x}<br>Value=%{y}<extra></extra>",
+        ))
+        # Axes of row r are xaxis<r> / yaxis<r>, the first without a number
+        suffix = row if row > 1 else ""
+        axes[f"xaxis{suffix}"] = {"title_text": "Date"}
+        axes[f"yaxis{suffix}"] = {"title_text": "Value", "range": [0, item_data[VALUE_COLUMN].max() * 1.1]}
+    # All traces and axes in one update each; per-row update_yaxes calls walk every axis every time
+    fig.add_traces(traces, rows=list(range(1, len(traces) + 1)), cols=1)
+    fig.update_layout(height=height, showlegend=False, **axes)
+    return fig
+
+def item_time_series_figure(item_data, title):
+    fig = go.Figure(line_trace(
+        item_data[TIME_COLUMN], item_data[VALUE_COLUMN], len(item_data) > WEBGL_POINTS,
+        hovertemplate="Date=%{x}<br>Value=%{y}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title="Date", yaxis_title="Value")
+    fig.update_yaxes(range=[0, item_data[VALUE_COLUMN].max() * 1.1])  # Start Y-axis at 0
+    return fig
+
+def global_map_figure(map_data, item, date):
+    return _drop_unused_customdata(px.choropleth(
+        map_data,
+        locations="iso_alpha",
+        color="value",
+        hover_name="country",
+        title=f"Global Map of {item} ({date})",
+        color_continuous_scale="Viridis",
+        hover_data={"iso_alpha": False, "value": True}  # Exclude 'iso_alpha' from hover
+    ))
+
+def animated_map_figure(history, item):
+    # One animation frame per year, on a colour scale shared by all frames; scrubbing happens in the browser
+    history = pd.DataFrame({
+        "iso_alpha": history["iso_alpha"], "country": history["country"], "value": history["value"],
+        "year": [date.year for date in history[TIME_COLUMN]],
+    })
+    return _drop_unused_customdata(px.choropleth(
+        history,
+        locations="iso_alpha",
+        color="value",
+        hover_name="country",
+        animation_frame="year",
+        range_color=[history["value"].min(), history["value"].max()],
+        title=f"Global Map of {item} (all years)",
+        color_continuous_scale="Viridis",
+        hover_data={"iso_alpha": False, "value": True, "year": False},
+    ))
+
+def comparison_figure(matrix, item, layout=COMPARISON_OVERLAID):
+    # matrix: startdate x country name. Overlaid lines, or one small chart per country on a shared y-axis
+    countries = list(matrix.columns)
+    webgl = matrix.count().sum() > WEBGL_POINTS
+    if layout == COMPARISON_OVERLAID:
+        fig = go.Figure()
+        for country in countries:
+            values = matrix[country].dropna()
+            fig.add_trace(line_trace(values.index, values.to_numpy(), webgl, name=country))
+        fig.update_layout(title=f"{item} Time Series", xaxis_title="Date", yaxis_title="Value")
+    else:
+        cols = min(len(countries), SMALL_MULTIPLE_COLUMNS) or 1
+        rows = max(-(-len(countries) // cols), 1)
+        fig = make_subplots(rows=rows, cols=cols, subplot_titles=countries, shared_yaxes=True,
+                            vertical_spacing=min(0.3 / rows, 0.1))
+        for i, country in enumerate(countries):
+            values = matrix[country].dropna()
+            fig.add_trace(line_trace(values.index, values.to_numpy(), webgl, name=country),
+                          row=i // cols + 1, col=i % cols + 1)
+        fig.update_layout(title=f"{item} Time Series", height=SMALL_MULTIPLE_HEIGHT * rows, showlegend=False)
+    fig.update_yaxes(rangemode="tozero")  # Start Y-axis at 0, like the single-country charts
+    return fig
+
+def correlation_figure(correlations, title):
+    # item x item heatmap on a fixed -1..1 scale, so colours mean the same for every item selection
+    fig = px.imshow(
+        correlations, zmin=-1, zmax=1, color_continuous_scale="RdBu", title=title, aspect="auto",
+        labels={"x": "", "y": "", "color": "Correlation"},
+    )
+    fig.update_layout(height=max(400, 40 * len(correlations)))
+    return fig
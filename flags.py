@@ -0,0 +1,76 @@
+import argparse
+import os
+
+from config import COUNTRY_MAPPING, FLAG_DIR, FLAG_THUMBNAIL_DIR, FLAG_THUMBNAIL_WIDTHS
+from fetcher import write_atomic
+
+try:
+    import cairosvg
+except (ImportError, OSError):  # optional (and needs libcairo): only to rasterize flags without a thumbnail
+    cairosvg = None
+
+
+class FlagAssets:
+    # Flags from the local flags/ directory, falling back to an HttpFetcher for missing files.
+    # Each flag is read once; thumbnails are rasterized once per width and kept as PNGs in thumbnail_dir,
+    # where `python flags.py` builds them ahead of time.
+    def __init__(self, directory, fetcher=None, thumbnail_dir=None, base_url=None):
+        self.directory = directory
+        self.fetcher = fetcher
+        self.thumbnail_dir = thumbnail_dir
+        self.base_url = base_url
+        self.svgs = {}
+        self.thumbnails = {}
+
+    def svg(self, iso_alpha_2):
+        if iso_alpha_2 not in self.svgs:
+            file_name = f"{iso_alpha_2}.svg"
+            path = os.path.join(self.directory, file_name)
+            if os.path.exists(path) or self.fetcher is None:
+                with open(path, "rb") as f:
+                    body = f.read()
+            else:
+                body = self.fetcher.fetch(file_name)
+            self.svgs[iso_alpha_2] = body.decode("utf-8")
+        return self.svgs[iso_alpha_2]
+
+    def thumbnail_path(self, iso_alpha_2, width):
+        return os.path.join(self.thumbnail_dir, f"{iso_alpha_2}-{width}.png")
+
+    def thumbnail(self, iso_alpha_2, width):
+        # PNG bytes, which st.image serves as a cacheable media URL, from thumbnail_dir or rasterized with
+        # cairosvg. Without either, the flag's URL under base_url, which the browser caches; only without
+        # a base_url the SVG markup, which st.image would inline into the page on every run.
+        key = (iso_alpha_2, width)
+        if key not in self.thumbnails:
+            path = self.thumbnail_path(iso_alpha_2, width) if self.thumbnail_dir else None
+            if path and os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.thumbnails[key] = f.read()
+            elif cairosvg is not None:
+                png = cairosvg.svg2png(bytestring=self.svg(iso_alpha_2).encode("utf-8"), output_width=width)
+                if path:
+                    os.makedirs(self.thumbnail_dir, exist_ok=True)
+                    write_atomic(path, png)
+                self.thumbnails[key] = png
+            elif self.base_url:
+                self.thumbnails[key] = f"{self.base_url}{iso_alpha_2}.svg"
+            else:
+                self.thumbnails[key] = self.svg(iso_alpha_2)
+        return self.thumbnails[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rasterize the dashboard's flags to PNG thumbnails.")
+    parser.add_argument("--output", default=FLAG_THUMBNAIL_DIR)
+    args = parser.parse_args()
+
+    if cairosvg is None:
+        parser.error("cairosvg (and libcairo) are needed to rasterize the flags")
+    assets = FlagAssets(FLAG_DIR, thumbnail_dir=args.output)
+    flags = sorted({country["iso_alpha_2"] for country in COUNTRY_MAPPING.values()})
+    for iso_alpha_2 in flags:
+        for width in FLAG_THUMBNAIL_WIDTHS:
+            assets.thumbnail(iso_alpha_2, width)
+    print(f"{len(flags)} flags x {len(FLAG_THUMBNAIL_WIDTHS)} widths -> {args.output}")
+
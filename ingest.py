@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+from config import (
+    DATASET_GLOB, GITHUB_RAW_BASE_URL, HTTP_CACHE_DIR, INGEST_STATE_PATH, LOCAL_DATASET_DIR, MANIFEST_PATH,
+    PANEL_PATH, dataset_country_code,
+)
+from fetcher import write_atomic
+from panel import Panel, build_manifest, build_panel, patch_panel, save_manifest
+from sources import SOURCE_LOCAL, SOURCE_OFFLINE, make_dataset_source
+
+COPY_PATTERN = re.compile(r" \(\d+\)\.csv$")  # browser re-downloads such as "..._bfa (1).csv"
+HASH_CHUNK_SIZE = 1 << 20
+# State entry of a dataset file deleted from disk: without it the file would be "new" (and fetched) next run
+DELETED = {"sha256": None, "deleted": True}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(directory, previous=None):
+    # {file_name: {"sha256", "size", "mtime_ns"}} of every CSV in the directory. A file whose size and
+    # mtime match the previous scan keeps its digest without being read again.
+    previous = previous or {}
+    scanned = {}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".csv") or not entry.is_file():
+            continue
+        stat = entry.stat()
+        old = previous.get(entry.name) or {}
+        if old.get("sha256") and old.get("size") == stat.st_size and old.get("mtime_ns") == stat.st_mtime_ns:
+            scanned[entry.name] = old
+        else:
+            scanned[entry.name] = {"sha256": file_digest(entry.path), "size": stat.st_size,
+                                   "mtime_ns": stat.st_mtime_ns}
+    return scanned
+
+
+def plan_ingest(scanned, previous, files=DATASET_GLOB):
+    # What has to be re-read since the previous ingest. A dataset file missing on disk is read through the
+    # source (GitHub) the first time and kept as it is afterwards; it is only "deleted" if it was on disk before.
+    # A deleted file stays deleted (its tombstone is unchanged) until it is back on disk, where it is new again.
+    # Other CSVs are reported as duplicates (same bytes as a dataset file) or untracked, never ingested.
+    plan = {"new": [], "changed": [], "deleted": [], "unchanged": [], "duplicates": {}, "untracked": []}
+    for file_name in files:
+        old = previous.get(file_name)
+        if file_name not in scanned:
+            if old is None:
+                plan["new"].append(file_name)
+            elif old.get("sha256"):
+                plan["deleted"].append(file_name)
+            else:
+                plan["unchanged"].append(file_name)
+        elif old is None or not old.get("sha256"):
+            plan["new"].append(file_name)
+        elif old["sha256"] != scanned[file_name]["sha256"]:
+            plan["changed"].append(file_name)
+        else:
+            plan["unchanged"].append(file_name)
+
+    dataset_digests = {scanned[file_name]["sha256"]: file_name for file_name in files if file_name in scanned}
+    for file_name in sorted(set(scanned) - set(files)):
+        original = dataset_digests.get(scanned[file_name]["sha256"])
+        if original is not None:
+            plan["duplicates"][file_name] = original
+        else:
+            plan["untracked"].append(file_name)
+    return plan
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Own temp file per call: the debug panel can ingest from two sessions
+    write_atomic(path, json.dumps(state, indent=1).encode())
+
+
+def changed_countries(previous, state):
+    # Countries whose file entry differs between two ingest states
+    files = set(previous) | set(state)
+    return {
+        dataset_country_code(file_name) for file_name in files
+        if (previous.get(file_name) or {}).get("sha256") != (state.get(file_name) or {}).get("sha256")
+        or (file_name in previous) != (file_name in state)
+    }
+
+
+def ingest(source, directory=LOCAL_DATASET_DIR, files=DATASET_GLOB, panel_path=PANEL_PATH,
+           state_path=INGEST_STATE_PATH, manifest_path=MANIFEST_PATH):
+    # Brings the panel artifact up to date with the dataset directory, parsing only new and changed files.
+    # Returns (panel, plan, countries whose rows changed). Without a previous state, builds everything.
+    previous = load_state(state_path) if os.path.exists(panel_path) else {}
+    scanned = scan_directory(directory, previous)
+    plan = plan_ingest(scanned, previous, files)
+    tombstones = [file_name for file_name in plan["unchanged"] if previous[file_name].get("deleted")]
+    gone = plan["deleted"] + tombstones
+    present = [file_name for file_name in files if file_name not in gone]
+    if previous:
+        touched = plan["new"] + plan["changed"] + plan["deleted"]
+        countries = {dataset_country_code(file_name) for file_name in touched}
+        panel = Panel.load(panel_path)
+        if countries:
+            panel = patch_panel(panel, source, present, countries)
+    else:
+        countries = {dataset_country_code(file_name) for file_name in present}
+        panel = build_panel(source, present)
+    if countries:
+        panel.save(panel_path)
+        save_manifest(build_manifest(panel), manifest_path)
+    # The state is written last: an interrupted run is simply redone
+    state = {file_name: scanned.get(file_name, {"sha256": None}) for file_name in present}
+    state.update({file_name: DELETED for file_name in gone})
+    save_state(state, state_path)
+    return panel, plan, countries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the panel from new, changed and deleted country files.")
+    parser.add_argument("--source", choices=[SOURCE_LOCAL, SOURCE_OFFLINE], default=SOURCE_LOCAL)
+    parser.add_argument("--full", action="store_true", help="forget the previous state and rebuild everything")
+    args = parser.parse_args()
+
+    if args.full and os.path.exists(INGEST_STATE_PATH):
+        os.remove(INGEST_STATE_PATH)
+    started = time.perf_counter()
+    source = make_dataset_source(args.source, LOCAL_DATASET_DIR, GITHUB_RAW_BASE_URL, cache_dir=HTTP_CACHE_DIR)
+    panel, plan, countries = ingest(source)
+    for kind in ["new", "changed", "deleted"]:
+        if plan[kind]:
+            print(f"{kind}: {', '.join(plan[kind])}")
+    for copy, original in plan["duplicates"].items():
+        print(f"duplicate, skipped: {copy} (same bytes as {original})")
+    for file_name in plan["untracked"]:
+        note = "a copy that differs from its original" if COPY_PATTERN.search(file_name) else "not in DATASET_GLOB"
+        print(f"untracked, skipped: {file_name} ({note})")
+    print(f"{len(countries)} countries re-read, {len(plan['unchanged'])} unchanged, {len(panel)} rows "
+          f"in {time.perf_counter() - started:.2f} s")
@@ -0,0 +1,104 @@
+import contextvars
+import copy
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Timings and counts of the run in progress in this context, see Metrics.start_run
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+class Metrics:
+    # Process-wide stage timers and counters. Timers keep count / total / max seconds per stage;
+    # every timing is also logged as one JSON line on the "metrics" logger.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.timers = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    def observe(self, stage, seconds):
+        run = _current_run.get()
+        with self.lock:
+            timer = self.timers.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0})
+            timer["count"] += 1
+            timer["total"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+            if run is not None:
+                run_timer = run["timers"].setdefault(stage, {"count": 0, "total": 0.0})
+                run_timer["count"] += 1
+                run_timer["total"] += seconds
+        if logger.isEnabledFor(logging.INFO):  # the log is opt-in: no JSON for every stage without it
+            logger.info(json.dumps({"event": "stage", "stage": stage, "seconds": round(seconds, 6)}))
+
+    def count(self, name, value=1):
+        run = _current_run.get()
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            if run is not None:
+                run["counters"][name] = run["counters"].get(name, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "timers": copy.deepcopy(self.timers),
+                "counters": dict(self.counters),
+            }
+
+    def start_run(self):
+        # From now on, timings and counts in this context are also added to the returned
+        # {"timers", "counters"}, e.g. for one Streamlit script run. Sessions run their scripts in
+        # their own threads, so a run never sees other sessions' work (nor that of worker threads).
+        run = {"timers": {}, "counters": {}}
+        _current_run.set(run)
+        return run
+
+
+METRICS = Metrics()
+
+
+def timed(stage):
+    # Decorator form of METRICS.timer
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with METRICS.timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def cache_counts(snapshot):
+    # {cache: (calls, misses)} from the cache.<name>.calls / cache.<name>.misses counters
+    caches = {}
+    for name, value in snapshot["counters"].items():
+        if name.startswith("cache."):
+            cache, kind = name[len("cache."):].rsplit(".", 1)
+            calls, misses = caches.get(cache, (0, 0))
+            caches[cache] = (calls + value, misses) if kind == "calls" else (calls, misses + value)
+    return caches
+
+def enable_metrics_log(path):
+    # JSON lines of every stage timing to a file, or to stderr for "-"
+    handler = logging.StreamHandler() if path == "-" else logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('{"time": "%(asctime)s", "metrics": %(message)s}'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handler
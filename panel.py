@@ -0,0 +1,225 @@
+import argparse
+import io
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    COUNTRY_COLUMN, DATASET_GLOB, GITHUB_RAW_BASE_URL, HTTP_CACHE_DIR, INCLUDED_ITEMS, ITEM_COLUMN,
+    LOCAL_DATASET_DIR, MANIFEST_PATH, PANEL_PATH, TIME_COLUMN, VALUE_COLUMN, dataset_country_code,
+)
+from fetcher import write_atomic
+from metrics import METRICS, timed
+from preprocessing import READ_CSV_OPTIONS, preprocess_data
+from sources import SOURCE_KINDS, SOURCE_LOCAL, make_dataset_source
+
+
+def _code_dtype(size):
+    return np.uint8 if size <= np.iinfo(np.uint8).max else np.uint16
+
+
+class Panel:
+    # One long table of every country file: (country, item, startdate, value), sorted in that order.
+    # Countries and items are stored once as category arrays and referenced by integer codes.
+    def __init__(self, countries, items, files, country_codes, item_codes, dates, values):
+        self.countries = np.asarray(countries)
+        self.items = np.asarray(items)
+        self.files = np.asarray(files)
+        self.country_codes = np.asarray(country_codes)
+        self.item_codes = np.asarray(item_codes)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.values = np.asarray(values, dtype=np.float64)
+        # Shared by every session: views handed out must not be able to write into the panel
+        for array in (self.country_codes, self.item_codes, self.dates, self.values):
+            array.flags.writeable = False
+        self.country_index = {country: i for i, country in enumerate(self.countries.tolist())}
+        self.item_index = {item: i for i, item in enumerate(self.items.tolist())}
+        # Rows of country i are [country_offsets[i], country_offsets[i + 1])
+        self.country_offsets = np.searchsorted(self.country_codes, np.arange(len(self.countries) + 1))
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.country_codes.nbytes + self.item_codes.nbytes + self.dates.nbytes + self.values.nbytes
+
+    def item_mask(self, item_codes, items):
+        if items is None:
+            return np.ones(len(item_codes), dtype=bool)
+        wanted = [self.item_index[item] for item in items if item in self.item_index]
+        return np.isin(item_codes, wanted)
+
+    def to_frame(self, items=None):
+        mask = self.item_mask(self.item_codes, items)
+        return pd.DataFrame({
+            COUNTRY_COLUMN: pd.Categorical.from_codes(self.country_codes[mask], self.countries),
+            ITEM_COLUMN: pd.Categorical.from_codes(self.item_codes[mask], self.items),
+            TIME_COLUMN: self.dates[mask],
+            VALUE_COLUMN: self.values[mask],
+        })
+
+    def country_frame(self, country, items=INCLUDED_ITEMS):
+        # Same columns and cell types as preprocess_data() on the country's CSV
+        i = self.country_index[country]
+        rows = slice(self.country_offsets[i], self.country_offsets[i + 1])
+        item_codes = self.item_codes[rows]
+        mask = self.item_mask(item_codes, items)
+        return pd.DataFrame({
+            ITEM_COLUMN: self.items[item_codes[mask]].astype(object),
+            TIME_COLUMN: self.dates[rows][mask].astype(object),
+            VALUE_COLUMN: self.values[rows][mask],
+        })
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Through a temp file: the app may be loading the panel while an ingest rewrites it
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            countries=self.countries, items=self.items, files=self.files,
+            country_codes=self.country_codes, item_codes=self.item_codes,
+            dates=self.dates, values=self.values,
+        )
+        write_atomic(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            return cls(**{name: npz[name] for name in npz.files})
+
+
+def read_country_rows(source, file_name):
+    # Long (country, item, startdate, value) rows of one country file, every item kept
+    data = preprocess_data(source.read_csv(file_name, **READ_CSV_OPTIONS), items=None)
+    return pd.DataFrame({
+        COUNTRY_COLUMN: dataset_country_code(file_name),
+        ITEM_COLUMN: data[ITEM_COLUMN].to_numpy(),
+        TIME_COLUMN: pd.to_datetime(data[TIME_COLUMN]).to_numpy(),
+        VALUE_COLUMN: data[VALUE_COLUMN].to_numpy(dtype=np.float64),
+    })
+
+
+@timed("build_panel")
+def build_panel(source, files=DATASET_GLOB):
+    source.prefetch(files)
+    data = pd.concat([read_country_rows(source, file_name) for file_name in files], ignore_index=True)
+    return assemble_panel(data, files)
+
+
+@timed("patch_panel")
+def patch_panel(panel, source, files, countries):
+    # New panel with the rows of `countries` replaced by a fresh read of their file in `files`;
+    # a country without a file there is dropped. Only those files are parsed.
+    files = list(files)
+    replaced = [file_name for file_name in files if dataset_country_code(file_name) in countries]
+    source.prefetch(replaced)
+    kept = panel.to_frame()
+    kept = kept[~kept[COUNTRY_COLUMN].isin(countries)]
+    frames = [kept.astype({COUNTRY_COLUMN: str, ITEM_COLUMN: str})]
+    frames += [read_country_rows(source, file_name) for file_name in replaced]
+    return assemble_panel(pd.concat(frames, ignore_index=True), files)
+
+
+def assemble_panel(data, files):
+    # Sorted, integer-coded Panel from long rows; files gives each country's file name
+    countries = pd.Categorical(data[COUNTRY_COLUMN])
+    items = pd.Categorical(data[ITEM_COLUMN])
+    country_codes = countries.codes.astype(_code_dtype(len(countries.categories)))
+    item_codes = items.codes.astype(_code_dtype(len(items.categories)))
+    dates = data[TIME_COLUMN].to_numpy().astype("datetime64[D]")
+    # Stable sort keeps the file order for any repeated (country, item, date) rows
+    order = np.lexsort((dates, item_codes, country_codes))
+    country_files = dict(zip(map(dataset_country_code, files), files))
+    return Panel(
+        countries=countries.categories.to_numpy(dtype=str),
+        items=items.categories.to_numpy(dtype=str),
+        files=np.array([country_files[country] for country in countries.categories]),
+        country_codes=country_codes[order],
+        item_codes=item_codes[order],
+        dates=dates[order],
+        values=data[VALUE_COLUMN].to_numpy()[order],
+    )
+
+
+def panel_is_stale(path, directory, files=DATASET_GLOB):
+    if not os.path.exists(path):
+        return True
+    built = os.path.getmtime(path)
+    sources = [os.path.join(directory, file_name) for file_name in files]
+    return any(os.path.getmtime(source) > built for source in sources if os.path.exists(source))
+
+
+def load_panel(path, source, directory, files=DATASET_GLOB):
+    if panel_is_stale(path, directory, files):
+        panel = build_panel(source, files)
+        panel.save(path)
+    else:
+        with METRICS.timer("load_panel"):
+            panel = Panel.load(path)
+    METRICS.count("rows.panel", len(panel))
+    return panel
+
+
+def build_manifest(panel):
+    # Small index of what the panel holds, so option lists never need the data itself
+    country_codes = panel.country_codes.astype(np.int64)
+    item_codes = panel.item_codes.astype(np.int64)
+    items = {}
+    for i, item in enumerate(panel.items.tolist()):
+        rows = item_codes == i
+        items[item] = {
+            "dates": np.unique(panel.dates[rows]).astype(str).tolist(),
+            "countries": panel.countries[np.unique(country_codes[rows])].tolist(),
+        }
+    countries = {}
+    for i, country in enumerate(panel.countries.tolist()):
+        rows = slice(panel.country_offsets[i], panel.country_offsets[i + 1])
+        dates = panel.dates[rows]
+        countries[country] = {
+            "file": str(panel.files[i]),
+            "rows": len(dates),
+            "items": len(np.unique(item_codes[rows])),
+            "first": str(dates.min()) if len(dates) else None,
+            "last": str(dates.max()) if len(dates) else None,
+        }
+    return {"items": items, "countries": countries}
+
+
+def save_manifest(manifest, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomic(path, json.dumps(manifest).encode())
+
+
+def load_manifest(path, panel, panel_path=PANEL_PATH):
+    # Rebuilt from the panel when missing or older than it
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(panel_path):
+        with open(path) as f:
+            return json.load(f)
+    manifest = build_manifest(panel)
+    save_manifest(manifest, path)
+    return manifest
+
+
+def manifest_options(manifest, items=INCLUDED_ITEMS):
+    # (sorted items, sorted dates) available for the given items
+    available = sorted(item for item in items if item in manifest["items"])
+    dates = {d for item in available for d in manifest["items"][item]["dates"]}
+    return available, sorted(date.fromisoformat(d) for d in dates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the consolidated panel from the per-country CSVs.")
+    parser.add_argument("--source", choices=SOURCE_KINDS, default=SOURCE_LOCAL)
+    parser.add_argument("--output", default=PANEL_PATH)
+    args = parser.parse_args()
+
+    panel = build_panel(make_dataset_source(args.source, LOCAL_DATASET_DIR, GITHUB_RAW_BASE_URL, cache_dir=HTTP_CACHE_DIR))
+    panel.save(args.output)
+    # Next to the panel, under the name the app looks for
+    save_manifest(build_manifest(panel), os.path.join(os.path.dirname(args.output), os.path.basename(MANIFEST_PATH)))
+    print(f"{len(panel)} rows, {len(panel.countries)} countries, {len(panel.items)} items, "
+          f"{panel.nbytes / 1024:.0f} KiB -> {args.output}")
@@ -0,0 +1,40 @@
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from config import INCLUDED_ITEMS, ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN
+from metrics import METRICS, timed
+
+# Read only the columns the dashboard uses, as strings, and skip the HXL tag row (#country+code,...)
+DATASET_COLUMNS = [ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN]
+READ_CSV_OPTIONS = {
+    "skiprows": [1],
+    "usecols": lambda column: column.lower().strip() in DATASET_COLUMNS,
+    "dtype": str,
+}
+
+
+def preprocess_values(values):
+    # Censored values such as "<2.5" or ">90" are kept at their bound
+    if is_numeric_dtype(values):
+        return values.astype(float)
+    values = values.str.replace(r"^[<>]", "", regex=True).str.strip()
+    return pd.to_numeric(values, errors="coerce").astype(float)
+
+def clean_dates(dates):
+    return pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+
+@timed("preprocess_data")
+def preprocess_data(data, items=INCLUDED_ITEMS):
+    # New frame (no copy under copy-on-write): the caller's frame may be a cached raw download
+    data = data.set_axis(data.columns.str.lower().str.strip(), axis=1)
+    if items is not None and ITEM_COLUMN in data.columns:
+        data = data[data[ITEM_COLUMN].isin(items)]  # Filter only included items
+    if TIME_COLUMN in data.columns:
+        dates = clean_dates(data[TIME_COLUMN])
+        valid = dates.notna()
+        data = data[valid]
+        data[TIME_COLUMN] = dates[valid].dt.date
+    if VALUE_COLUMN in data.columns:
+        data[VALUE_COLUMN] = preprocess_values(data[VALUE_COLUMN])
+    METRICS.count("rows.preprocessed", len(data))
+    return data
@@ -0,0 +1,87 @@
+import numpy as np
+
+from aggregates import as_dates
+from config import ITEM_COLUMN, TIME_COLUMN, VALUE_COLUMN
+
+
+def _group_searchsorted(sorted_values, starts, ends, values, right):
+    # np.searchsorted of values[i] within sorted_values[starts[i]:ends[i]] (side "right" where right[i]),
+    # for every i at once: a binary search run in lockstep over all queries, ~log2(countries) numpy steps
+    lo, hi = starts.copy(), ends.copy()
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo
+        mid = (lo + hi) // 2
+        probe = sorted_values[np.where(active, mid, 0)]
+        after = (probe < values) | (right & (probe == values))
+        lo = np.where(active & after, mid + 1, lo)
+        hi = np.where(active & ~after, mid, hi)
+
+
+class RankIndex:
+    # Every country's value per (startdate, item), sorted within each group and stored back to back:
+    # group g is sorted_values[offsets[g]:offsets[g + 1]]. Ranks and percentiles are binary searches.
+    def __init__(self, groups, offsets, sorted_values):
+        self.group_index = {group: g for g, group in enumerate(groups)}
+        self.offsets = np.asarray(offsets)
+        self.sorted_values = np.asarray(sorted_values, dtype=np.float64)
+        self.counts = np.diff(self.offsets)
+        group_ids = np.repeat(np.arange(len(self.counts)), self.counts)
+        self.mean = np.bincount(group_ids, self.sorted_values, len(self.counts)) / np.maximum(self.counts, 1)
+        deviations = (self.sorted_values - self.mean[group_ids]) ** 2
+        self.std = np.sqrt(np.bincount(group_ids, deviations, len(self.counts)) / np.maximum(self.counts, 1))
+        nonempty = self.counts > 0
+        self.min = np.full(len(self.counts), np.nan)
+        self.max = np.full(len(self.counts), np.nan)
+        self.min[nonempty] = self.sorted_values[self.offsets[:-1][nonempty]]
+        self.max[nonempty] = self.sorted_values[self.offsets[1:][nonempty] - 1]
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def nbytes(self):
+        arrays = [self.offsets, self.sorted_values, self.counts, self.mean, self.std, self.min, self.max]
+        return sum(array.nbytes for array in arrays)
+
+    def lookup(self, date, items, values):
+        # {column: array} of rank (1 = highest), countries, percentile, z-score and position in the
+        # min-max range for each (item, value) on one date; NaN where either is missing
+        values = np.asarray(values, dtype=np.float64)
+        groups = np.array([self.group_index.get((date, item), -1) for item in items], dtype=np.int64)
+        known = (groups >= 0) & ~np.isnan(values)
+        g = np.where(known, groups, 0)
+        starts, ends = self.offsets[g], self.offsets[g + 1]
+        # Both sides in one search: values below, and values below or equal
+        both = np.tile(starts, 2)
+        found = _group_searchsorted(
+            self.sorted_values, both, np.tile(ends, 2), np.tile(values, 2), np.repeat([False, True], len(values))
+        ) - both
+        below, not_above = found[:len(values)], found[len(values):]
+        counts = self.counts[g]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = {
+                "rank": counts - not_above + 1,
+                "countries": counts,
+                "percentile": (below + (not_above - below) / 2) / counts * 100,
+                "z_score": (values - self.mean[g]) / self.std[g],
+                "range_position": (values - self.min[g]) / (self.max[g] - self.min[g]) * 100,
+            }
+        # A single country or identical values has no spread, so no z-score or range position
+        return {name: np.where(known & np.isfinite(column), column, np.nan) for name, column in result.items()}
+
+
+def build_rank_index(data):
+    # data is the long (country, item, startdate, value) table; NaN values are left out
+    data = data[data[VALUE_COLUMN].notna()]
+    grouped = data.groupby([as_dates(data[TIME_COLUMN]), data[ITEM_COLUMN]], observed=True, sort=True)
+    group_ids = grouped.ngroup().to_numpy()
+    sizes = grouped.size()
+    values = data[VALUE_COLUMN].to_numpy(dtype=np.float64)
+    order = np.lexsort((values, group_ids))
+    return RankIndex(
+        groups=sizes.index.tolist(),
+        offsets=np.concatenate([[0], np.cumsum(sizes.to_numpy())]),
+        sorted_values=values[order],
+    )
@@ -0,0 +1,79 @@
+import os
+from io import BytesIO
+
+import pandas as pd
+import requests
+
+from fetcher import HttpFetcher
+from metrics import METRICS
+
+# Dataset source kinds
+SOURCE_LOCAL = "local"      # local directory, HTTP only if the file is missing
+SOURCE_OFFLINE = "offline"  # local directory only, never touches the network
+SOURCE_REMOTE = "remote"    # HTTP only (previous behaviour)
+SOURCE_KINDS = [SOURCE_LOCAL, SOURCE_OFFLINE, SOURCE_REMOTE]
+
+
+class LocalDatasetSource:
+    def __init__(self, directory, memory_map=False):
+        self.directory = directory
+        self.memory_map = memory_map
+
+    def path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def prefetch(self, file_names):
+        # Returns the files this source cannot serve
+        return [file_name for file_name in file_names if not os.path.exists(self.path(file_name))]
+
+    def read_csv(self, file_name, **kwargs):
+        # Decode like the HTTP source does: a stray latin-1 byte (e.g. civ) must not fail the read
+        METRICS.count("local.bytes", os.path.getsize(self.path(file_name)))
+        return pd.read_csv(self.path(file_name), memory_map=self.memory_map, encoding_errors="replace", **kwargs)
+
+
+class HttpDatasetSource:
+    def __init__(self, base_url, cache_dir=None, **fetcher_options):
+        self.fetcher = HttpFetcher(base_url, cache_dir, **fetcher_options)
+        self.prefetched = {}
+
+    def prefetch(self, file_names):
+        # Downloads (or revalidates) all files concurrently; each body is handed to the next read_csv
+        bodies, errors = self.fetcher.fetch_many(file_names)
+        self.prefetched.update(bodies)
+        return list(errors)
+
+    def read_csv(self, file_name, **kwargs):
+        body = self.prefetched.pop(file_name, None)
+        if body is None:
+            body = self.fetcher.fetch(file_name)
+        return pd.read_csv(BytesIO(body), encoding_errors="replace", **kwargs)
+
+
+class FallbackDatasetSource:
+    def __init__(self, *sources):
+        self.sources = sources
+
+    def prefetch(self, file_names):
+        for source in self.sources:
+            file_names = source.prefetch(file_names)
+        return file_names
+
+    def read_csv(self, file_name, **kwargs):
+        error = None
+        for source in self.sources:
+            try:
+                return source.read_csv(file_name, **kwargs)
+            except (OSError, requests.RequestException) as e:
+                error = e
+        raise error
+
+
+def make_dataset_source(kind, directory, base_url, memory_map=False, cache_dir=None):
+    if kind == SOURCE_LOCAL:
+        return FallbackDatasetSource(LocalDatasetSource(directory, memory_map), HttpDatasetSource(base_url, cache_dir))
+    if kind == SOURCE_OFFLINE:
+        return LocalDatasetSource(directory, memory_map)
+    if kind == SOURCE_REMOTE:
+        return HttpDatasetSource(base_url, cache_dir)
+    raise ValueError(f"Unknown dataset source {kind!r}, expected one of {SOURCE_KINDS}")
@@ -0,0 +1,89 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from metrics import METRICS
+
+
+def result_nbytes(value):
+    # Deep size of a derived result, as far as it can be measured cheaply
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if hasattr(value, "nbytes"):
+        # numpy arrays, and array containers such as IndicatorArray and RankIndex
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_nbytes(k) + result_nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class DataStore:
+    # One per process, shared by every session: the read-only panel plus derived results (country
+    # frames, value matrices, ...) computed once and handed out as the same object, never a copy.
+    # Derived results are kept under budget_bytes, least recently used evicted first.
+    # Results must not be mutated in place; copy-on-write pandas makes ordinary assignments safe.
+    def __init__(self, panel, budget_bytes, state=None):
+        self.panel = panel
+        self.budget_bytes = budget_bytes
+        self.results = OrderedDict()  # (name, key) -> (value, nbytes)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        # Bumped by update(): results computed from an older panel are not stored
+        self.version = 0
+        # Ingest state the panel was built from
+        self.state = state
+        self.update_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, name, key, compute):
+        # Hits and misses are counted like the Streamlit caches, as cache.<name>.calls / .misses
+        METRICS.count(f"cache.{name}.calls")
+        with self.lock:
+            if (name, key) in self.results:
+                self.results.move_to_end((name, key))
+                return self.results[(name, key)][0]
+            version = self.version
+        METRICS.count(f"cache.{name}.misses")
+        with METRICS.timer(name):
+            value = compute()
+        self.put(name, key, value, version)
+        return value
+
+    def put(self, name, key, value, version=None):
+        # With a version, the value is dropped if update() swapped the panel since that version
+        size = result_nbytes(value)
+        with self.lock:
+            if version is not None and version != self.version:
+                METRICS.count("store.discarded")
+                return
+            if (name, key) in self.results:
+                self.nbytes -= self.results.pop((name, key))[1]
+            self.results[(name, key)] = (value, size)
+            self.nbytes += size
+            # The newest result always stays, even when it alone is over budget
+            while self.nbytes > self.budget_bytes and len(self.results) > 1:
+                self.nbytes -= self.results.popitem(last=False)[1][1]
+                METRICS.count("store.evictions")
+
+    def update(self, panel, patches, stale):
+        # Swap in a re-ingested panel. Results named in `patches` are patched (old value -> new value),
+        # results with stale(name, key) are dropped, all others are kept.
+        with self.lock:
+            current = [(key, value) for key, (value, _) in self.results.items() if key[0] in patches]
+        patched = [(key, patches[key[0]](value)) for key, value in current]
+        with self.lock:
+            self.panel = panel
+            self.version += 1
+            version = self.version
+            for key in [key for key in self.results if stale(*key)]:
+                self.nbytes -= self.results.pop(key)[1]
+        for (name, key), value in patched:
+            self.put(name, key, value, version)
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from fetcher import HttpFetcher
+
+FILES = {f"country_{i}.csv": f"Item,Value\nwheat,{i}\n".encode() for i in range(5)}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # Serves FILES with ETags like raw.githubusercontent.com; each name in fail_once gets one 503 first
+    files = FILES
+    fail_once = set()
+    max_age = 0
+    statuses = []
+
+    def do_GET(self):
+        name = self.path.lstrip("/")
+        body = self.files.get(name)
+        if name in self.fail_once:
+            self.fail_once.discard(name)
+            self.reply(503)
+        elif body is None:
+            self.reply(404)
+        elif self.headers.get("If-None-Match") == etag(body):
+            self.reply(304)
+        else:
+            self.reply(200, body)
+
+    def reply(self, status, body=b""):
+        self.statuses.append(status)
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if status in (200, 304):
+            self.send_header("ETag", etag(self.files[self.path.lstrip("/")]))
+            self.send_header("Cache-Control", f"max-age={self.max_age}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def etag(body):
+    return f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+@pytest.fixture
+def server():
+    StandIn.fail_once, StandIn.max_age, StandIn.statuses = set(), 0, []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retries_then_revalidates_from_cache(server, tmp_path):
+    StandIn.fail_once = {"country_0.csv", "country_3.csv"}
+    bodies, errors = HttpFetcher(server, tmp_path, backoff_factor=0).fetch_many(FILES)
+    assert bodies == FILES and errors == {}
+    assert sorted(StandIn.statuses) == [200] * len(FILES) + [503, 503]
+
+    # Warm pass, as after a restart: every file is revalidated with its ETag and comes from the cache
+    StandIn.statuses = []
+    bodies, errors = HttpFetcher(server, tmp_path).fetch_many(FILES)
+    assert bodies == FILES and errors == {}
+    assert StandIn.statuses == [304] * len(FILES)
+
+
+def test_fresh_cache_skips_the_request(server, tmp_path):
+    StandIn.max_age = 300
+    fetcher = HttpFetcher(server, tmp_path)
+    assert fetcher.fetch("country_1.csv") == FILES["country_1.csv"]
+    assert fetcher.fetch("country_1.csv") == FILES["country_1.csv"]
+    assert StandIn.statuses == [200]
+
+
+def test_missing_file_is_reported(server, tmp_path):
+    bodies, errors = HttpFetcher(server, tmp_path).fetch_many(["country_2.csv", "missing.csv"])
+    assert list(bodies) == ["country_2.csv"]
+    assert isinstance(errors["missing.csv"], requests.HTTPError)
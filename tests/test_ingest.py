@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import pytest
+
+from config import DATASET_GLOB, GITHUB_RAW_BASE_URL, LOCAL_DATASET_DIR, dataset_country_code
+from ingest import ingest, load_state
+from sources import SOURCE_OFFLINE, make_dataset_source
+
+FILES = DATASET_GLOB[:3]
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    directory = tmp_path / "datasets"
+    directory.mkdir()
+    for file_name in FILES:
+        shutil.copy(os.path.join(LOCAL_DATASET_DIR, file_name), directory / file_name)
+    return directory
+
+
+def run_ingest(directory):
+    # Offline: a file that is not on disk raises instead of being fetched from GitHub
+    source = make_dataset_source(SOURCE_OFFLINE, str(directory), GITHUB_RAW_BASE_URL)
+    artifacts = directory.parent / "artifacts"
+    return ingest(source, str(directory), FILES, str(artifacts / "panel.npz"), str(artifacts / "ingest.json"),
+                  str(artifacts / "manifest.json"))
+
+
+def test_deleted_file_stays_deleted(dataset_dir):
+    run_ingest(dataset_dir)
+    (dataset_dir / FILES[0]).unlink()
+
+    panel, plan, countries = run_ingest(dataset_dir)
+    assert plan["deleted"] == [FILES[0]]
+    assert countries == {dataset_country_code(FILES[0])}
+    assert dataset_country_code(FILES[0]) not in panel.country_index
+
+    panel, plan, countries = run_ingest(dataset_dir)
+    assert plan["new"] == [] and plan["deleted"] == []
+    assert countries == set()
+    assert sorted(panel.countries) == sorted(dataset_country_code(file_name) for file_name in FILES[1:])
+    assert load_state(str(dataset_dir.parent / "artifacts" / "ingest.json"))[FILES[0]]["deleted"]
+
+
+def test_deleted_file_back_on_disk_is_new(dataset_dir):
+    run_ingest(dataset_dir)
+    backup = dataset_dir.parent / FILES[0]
+    shutil.move(dataset_dir / FILES[0], backup)
+    run_ingest(dataset_dir)
+    shutil.move(backup, dataset_dir / FILES[0])
+
+    panel, plan, countries = run_ingest(dataset_dir)
+    assert plan["new"] == [FILES[0]]
+    assert dataset_country_code(FILES[0]) in panel.country_index
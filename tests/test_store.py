@@ -0,0 +1,22 @@
+from store import DataStore
+
+
+def test_result_computed_before_update_is_not_stored():
+    store = DataStore("old panel", 2 ** 20)
+
+    def compute():
+        # A re-ingest lands while this session is still computing from the old panel
+        store.update("new panel", {}, lambda name, key: name == "country_data")
+        return "from old panel"
+
+    assert store.get("country_data", ("chn",), compute) == "from old panel"
+    assert len(store) == 0
+    assert store.get("country_data", ("chn",), lambda: "from new panel") == "from new panel"
+    assert store.get("country_data", ("chn",), lambda: "recomputed") == "from new panel"
+
+
+def test_update_patches_results():
+    store = DataStore("old panel", 2 ** 20)
+    store.get("combined_data", (), lambda: 1)
+    store.update("new panel", {"combined_data": lambda value: value + 1}, lambda name, key: False)
+    assert store.get("combined_data", (), lambda: None) == 2